@@ -0,0 +1,53 @@
+"""
+Redis cache for serialized responses of read-heavy list endpoints
+"""
+
+import logging
+import os
+from typing import Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Cached pages are stored as raw JSON bytes, so responses skip decoding entirely
+try:
+    redis_client = redis.from_url(REDIS_URL) if REDIS_URL else None
+except Exception as e:
+    logger.warning("Redis connection error: %s", e)
+    redis_client = None
+
+def _namespace_key(namespace: str) -> str:
+    """Redis hash holding every cached page of a namespace, one field per page"""
+    return f"cache:{namespace}"
+
+def get_cached_page(namespace: str, field: str) -> Optional[bytes]:
+    """Return a cached page's JSON, or None on a miss or when Redis is unavailable"""
+    if not redis_client:
+        return None
+    try:
+        return redis_client.hget(_namespace_key(namespace), field)
+    except Exception as e:
+        logger.warning("Redis error: %s", e)
+        return None
+
+def cache_page(namespace: str, field: str, payload: bytes, ttl: int):
+    """Store a page's JSON; the whole namespace expires ttl seconds after its last write"""
+    if not redis_client or ttl <= 0:
+        return
+    key = _namespace_key(namespace)
+    try:
+        redis_client.pipeline().hset(key, field, payload).expire(key, ttl).execute()
+    except Exception as e:
+        logger.warning("Redis error: %s", e)
+
+def invalidate_pages(namespace: str):
+    """Drop every cached page of a namespace after its data changes"""
+    if not redis_client:
+        return
+    try:
+        redis_client.delete(_namespace_key(namespace))
+    except Exception as e:
+        logger.warning("Redis error: %s", e)
@@ -0,0 +1,165 @@
+"""
+Database engine and sessions for the API, with a connection pool sized for concurrent requests
+"""
+
+import base64
+import os
+import uuid
+import orjson
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+from sqlalchemy import Select, create_engine, func, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from agir_db.db.session import SQLALCHEMY_DATABASE_URI
+from agir_db.models.user import User
+
+# Pool settings (can be overridden via environment variables)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+# The asyncpg engine only serves the chat read endpoints, so it gets a smaller pool
+DB_ASYNC_POOL_SIZE = int(os.environ.get("DB_ASYNC_POOL_SIZE", 5))
+DB_ASYNC_MAX_OVERFLOW = int(os.environ.get("DB_ASYNC_MAX_OVERFLOW", 5))
+# Set when connecting through an external pooler such as PgBouncer
+DB_EXTERNAL_POOL = os.environ.get("DB_EXTERNAL_POOL", "false").lower() in ["true", "1", "yes"]
+# Connections opened at startup so the first requests don't pay for connecting
+DB_POOL_PREWARM = int(os.environ.get("DB_POOL_PREWARM", 5))
+# Rows fetched from the server-side cursor per chunk when streaming large lists
+DB_STREAM_BATCH_SIZE = int(os.environ.get("DB_STREAM_BATCH_SIZE", 500))
+
+def _pool_options(pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    """Engine pool arguments for a pool of the given size"""
+    if DB_EXTERNAL_POOL:
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+        # Reuse the most recently returned connection, so a small hot set serves
+        # normal load and idle extras can be recycled
+        "pool_use_lifo": True,
+    }
+
+engine = create_engine(SQLALCHEMY_DATABASE_URI, **_pool_options(DB_POOL_SIZE, DB_MAX_OVERFLOW))
+
+# asyncpg engine for read endpoints that run on the event loop instead of a worker thread
+ASYNC_DATABASE_URI = make_url(SQLALCHEMY_DATABASE_URI).set(drivername="postgresql+asyncpg")
+async_engine = create_async_engine(ASYNC_DATABASE_URI, **_pool_options(DB_ASYNC_POOL_SIZE, DB_ASYNC_MAX_OVERFLOW))
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def warm_pool():
+    """Open DB_POOL_PREWARM pooled connections and return them to the pool"""
+    if DB_EXTERNAL_POOL:
+        return
+    connections = []
+    try:
+        for _ in range(min(DB_POOL_PREWARM, DB_POOL_SIZE)):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+def get_db():
+    """Yield a database session from the API's connection pool"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """Yield an async database session from the API's asyncpg connection pool"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def row_exists(db, model, id) -> bool:
+    """Check whether a row with the given primary key exists, without loading it"""
+    return db.query(db.query(model.id).filter(model.id == id).exists()).scalar()
+
+def model_to_dict(obj: Any) -> Dict[str, Any]:
+    """Column attributes of an ORM object as a dict, ready for orjson"""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+def encode_created_cursor(created_at: datetime, id: uuid.UUID, *leading: Any) -> str:
+    """
+    Opaque keyset cursor for the page of rows after (*leading, created_at, id), newest first
+    
+    leading holds any sort keys ordered before created_at, e.g. a memory's importance.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps([*leading, created_at, id])).decode("ascii")
+
+def decode_created_cursor(cursor: str, leading: int = 0) -> Tuple[Any, ...]:
+    """
+    Decode a cursor made by encode_created_cursor
+    
+    Args:
+        cursor: The encoded cursor
+        leading: Number of sort keys the cursor holds before created_at
+        
+    Returns:
+        The (*leading, created_at, id) key the next page starts after
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        *prefix, created_at, id = orjson.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if len(prefix) != leading:
+            raise ValueError("wrong number of sort keys")
+        return (*prefix, datetime.fromisoformat(created_at), uuid.UUID(id))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+# Total matching rows, computed by the page query itself before OFFSET/LIMIT apply
+page_total_column = func.count().over().label("total")
+
+def page_total(rows: List[Any], page: int, query: Any) -> int:
+    """Total row count of a page selected with page_total_column; counted separately only past the last page"""
+    if rows:
+        return rows[0].total
+    return query.count() if page > 1 else 0
+
+# Message sender names computed in SQL: their full name when both parts are set,
+# otherwise their username, and "Unknown" without a sender. Select it alongside
+# an outer join of User on the message's sender_id
+sender_name = func.coalesce(
+    func.nullif(User.first_name, "").concat(" ").concat(func.nullif(User.last_name, "")),
+    User.username,
+    "Unknown"
+).label("sender_name")
+
+def stream_json_rows(statement: Select, batch_size: int = DB_STREAM_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Run a select and yield its rows as a JSON array, one batch of rows at a time
+    
+    The query runs on its own session, since the response is still streaming after
+    the request's dependencies have been closed.
+    
+    Args:
+        statement: Select of the columns to return for each row
+        batch_size: Rows fetched from the database per chunk
+        
+    Returns:
+        Iterator of JSON bytes making up one array of row objects
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        yield b"["
+        first = True
+        for rows in result.mappings().partitions():
+            chunk = b",".join(orjson.dumps(dict(row)) for row in rows)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+    finally:
+        db.close()
@@ -1,12 +1,22 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
+import anyio.to_thread
+import os
+import time
 import uvicorn
 
-from agir_db.db.session import get_db
+from api.database import get_db, warm_pool
+from api.run import setup_logging
 from api.routes import scenarios, episodes, steps, users, memories, chat, auth, completions
 
-app = FastAPI(title="AGIR API", description="API for AGIR Scenario Visualization")
+app = FastAPI(
+    title="AGIR API",
+    description="API for AGIR Scenario Visualization",
+    default_response_class=ORJSONResponse
+)
 
 # Configure CORS for frontend
 app.add_middleware(
@@ -17,6 +27,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Blocking endpoints (database queries, LLM calls) are plain `def` handlers that
+# run in AnyIO's worker threads; raise its default limit of 40 threads
+API_THREAD_LIMIT = int(os.environ.get("API_THREAD_LIMIT", 200))
+
+@app.on_event("startup")
+async def configure_logging():
+    # Worker processes started by uvicorn (--workers, --reload) import this app without
+    # running api/run.py, so set up the queued logging here; a no-op if already done
+    setup_logging(os.environ.get("LOG_LEVEL", "INFO"))
+
+@app.on_event("startup")
+async def configure_thread_limiter():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREAD_LIMIT
+
+@app.on_event("startup")
+async def warm_database_pool():
+    try:
+        await anyio.to_thread.run_sync(warm_pool)
+    except Exception as e:
+        # The API still starts; requests connect on demand
+        print(f"Database pool warm-up failed: {e}")
+
+@app.on_event("startup")
+async def check_search_indexes():
+    try:
+        if not await anyio.to_thread.run_sync(users.user_search_index_exists):
+            print(
+                "Warning: users has no pg_trgm index, so user search scans the whole table. "
+                f"Create it with:{users.USER_SEARCH_INDEX_DDL}"
+            )
+    except Exception as e:
+        print(f"User search index check failed: {e}")
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(scenarios.router, prefix="/api/scenarios", tags=["scenarios"])
@@ -31,15 +74,32 @@ app.include_router(completions.router, prefix="/api/completions", tags=["complet
 async def root():
     return {"message": "Welcome to AGIR API"}
 
-@app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    # Check database connection
+# Health check results are reused for a few seconds so frequent probes
+# don't each take a pooled connection and run a query
+HEALTH_CHECK_TTL = 5.0
+_health_cache = {"checked_at": None, "result": None}
+
+def _check_database() -> dict:
+    """Run a trivial query to check the database connection"""
+    db = None
     try:
-        # Execute a simple query
-        db.execute("SELECT 1")
+        db = next(get_db())
+        db.execute(text("SELECT 1"))
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": str(e)}
+    finally:
+        if db is not None:
+            db.close()
+
+@app.get("/health")
+async def health_check():
+    now = time.monotonic()
+    checked_at = _health_cache["checked_at"]
+    if checked_at is None or now - checked_at >= HEALTH_CHECK_TTL:
+        _health_cache["result"] = await anyio.to_thread.run_sync(_check_database)
+        _health_cache["checked_at"] = now
+    return _health_cache["result"]
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -1,46 +1,99 @@
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from collections import OrderedDict
+from typing import Any, Optional
 import jwt
-import os
+import threading
+import time
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from agir_db.db.session import get_db
+from api.database import get_db
+from api.middleware.tokens import decode_jwt
 from agir_db.models.user import User
 
-JWT_SECRET = os.environ.get("JWT_SECRET")
 security = HTTPBearer()
 
-async def get_current_user(
+# Bounded TTL caches so repeated requests with the same bearer token skip
+# HMAC verification and the user lookup
+_CACHE_MAX_SIZE = 10000
+_PAYLOAD_CACHE_TTL = 60  # seconds
+_USER_CACHE_TTL = 30  # seconds
+
+_payload_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(cache: OrderedDict, key: str) -> Optional[Any]:
+    """Return a cached value if present and not expired"""
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.time():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+def _cache_set(cache: OrderedDict, key: str, value: Any, ttl: float):
+    """Cache a value for ttl seconds, evicting least recently used entries"""
+    if ttl <= 0:
+        return
+    with _cache_lock:
+        cache[key] = (time.time() + ttl, value)
+        cache.move_to_end(key)
+        while len(cache) > _CACHE_MAX_SIZE:
+            cache.popitem(last=False)
+
+def _decode_token(token: str) -> dict:
+    """Decode a JWT token, reusing the payload of recently seen tokens"""
+    payload = _cache_get(_payload_cache, token)
+    if payload is None:
+        payload = decode_jwt(token)
+        # Never cache a payload beyond its own expiration
+        ttl = _PAYLOAD_CACHE_TTL
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        _cache_set(_payload_cache, token, payload, ttl)
+    return payload
+
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
     """Verify JWT token and return the current user"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=["HS256"])
-        user_id = payload.get("sub")
-        
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-            )
-            
-        # Get user from database
-        user = db.query(User).filter(User.id == user_id).first()
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
-        
-        return user
+        payload = _decode_token(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired",
         )
-    except (jwt.InvalidTokenError, Exception) as e:
+    except jwt.InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+        )
+    
+    user_id = payload.get("sub")
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Invalid authentication credentials: {str(e)}",
-        ) 
\ No newline at end of file
+            detail="Invalid authentication credentials",
+        )
+    
+    # Get user from cache or database. Only the column values are loaded, as an
+    # immutable row, so concurrent requests can share the cached user safely
+    user = _cache_get(_user_cache, user_id)
+    if user is None:
+        user = db.execute(select(User.__table__).where(User.id == user_id)).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        _cache_set(_user_cache, user_id, user, _USER_CACHE_TTL)
+    
+    return user
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import Request, Response
+from typing import Any, Dict, Optional
+import hashlib
+import os
+
+# Clients may reuse a response briefly, then must revalidate it with If-None-Match
+CACHE_CONTROL = os.environ.get("API_CACHE_CONTROL", "max-age=10, stale-while-revalidate=60")
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from the values that change whenever the response does"""
+    digest = hashlib.md5("|".join(map(str, parts)).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Caching headers for a response with the given ETag"""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+def check_etag(request: Request, response: Optional[Response], etag: str) -> Optional[Response]:
+    """
+    Validate a request against the current ETag of its resource
+
+    Args:
+        request: Incoming request, whose If-None-Match header is checked
+        response: Response the handler's result will be merged into, or None
+            when the handler builds its own response with etag_headers
+        etag: Current ETag of the resource
+
+    Returns:
+        A 304 Not Modified response if the client's copy is current, otherwise
+        None after setting the ETag and Cache-Control headers on response
+    """
+    headers = etag_headers(etag)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        # Weak comparison: W/"x" and "x" match each other
+        if "*" in tags or etag in tags or etag[2:] in tags:
+            return Response(status_code=304, headers=headers)
+    if response is not None:
+        response.headers.update(headers)
+    return None
@@ -0,0 +1,51 @@
+import binascii
+import hmac
+import json
+import jwt
+import os
+import time
+from jwt.algorithms import HMACAlgorithm
+from jwt.utils import base64url_decode
+
+JWT_SECRET = os.environ.get("JWT_SECRET")
+
+# HS256 signing key prepared once instead of on every encode/decode
+_HS256 = HMACAlgorithm(HMACAlgorithm.SHA256)
+JWT_KEY = _HS256.prepare_key(JWT_SECRET) if JWT_SECRET else None
+
+def decode_jwt(token: str) -> dict:
+    """
+    Verify an HS256 JWT with the prepared key and return its payload.
+    
+    Raises the same exceptions as jwt.decode, without building PyJWT's
+    per-call options and validation structures.
+    """
+    if JWT_KEY is None:
+        raise jwt.InvalidKeyError("JWT_SECRET is not configured")
+    
+    try:
+        signing_input, _, crypto_segment = token.rpartition(".")
+        header_segment, payload_segment = signing_input.split(".")
+        header = json.loads(base64url_decode(header_segment))
+        payload = json.loads(base64url_decode(payload_segment))
+        signature = base64url_decode(crypto_segment)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise jwt.DecodeError("Invalid token") from e
+    
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid token")
+    if header.get("alg") != "HS256":
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    if not hmac.compare_digest(_HS256.sign(signing_input.encode("utf-8"), JWT_KEY), signature):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    
+    now = time.time()
+    for claim in ("exp", "nbf"):
+        if claim in payload and not isinstance(payload[claim], (int, float)):
+            raise jwt.DecodeError(f"{claim} claim must be a number")
+    if "exp" in payload and payload["exp"] <= now:
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    if "nbf" in payload and payload["nbf"] > now:
+        raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+    
+    return payload
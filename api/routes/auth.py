@@ -1,55 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import asyncio
 import uuid
-import random
-import string
+import secrets
 import redis
 import os
 import jwt
 import re
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime, timezone
 from azure.communication.email import EmailClient
 from azure.core.credentials import AzureKeyCredential
 
-from agir_db.db.session import get_db
+from api.cache import invalidate_pages
+from api.database import get_db
 from agir_db.models.user import User
+from api.middleware.tokens import JWT_KEY, decode_jwt
 
 # Get environment variables
 EMAIL_CONNECTION_STRING = os.environ.get("EMAIL_CONNECTION_STRING")
 EMAIL_FROM = os.environ.get("EMAIL_FROM")
 REDIS_URL = os.environ.get("REDIS_URL")
-JWT_SECRET = os.environ.get("JWT_SECRET")
+
+# Basic address shape check, run before any Redis or email work
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 # Parse JWT expiration time with units (e.g. "7d" for 7 days)
+_EXPIRATION_RE = re.compile(r"^(\d+)([smhd])?$")
+_UNIT_SECONDS = {None: 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
 def parse_expiration_time(expiration_str: str) -> int:
     """Parse expiration time with units (s, m, h, d) to seconds"""
-    if not expiration_str:
-        return 3600  # Default to 1 hour
-
-    match = re.match(r"^(\d+)([smhd])?$", expiration_str)
+    match = _EXPIRATION_RE.match(expiration_str or "")
     if not match:
-        return 3600  # Default to 1 hour if format is invalid
-
-    value, unit = match.groups()
-    value = int(value)
-    
-    if unit == "s" or unit is None:
-        return value
-    elif unit == "m":
-        return value * 60
-    elif unit == "h":
-        return value * 3600
-    elif unit == "d":
-        return value * 86400
+        return 3600  # Default to 1 hour if empty or format is invalid
     
-    return 3600  # Default to 1 hour if unit is invalid
+    value, unit = match.groups()
+    return int(value) * _UNIT_SECONDS[unit]
 
 JWT_EXPIRES_IN = parse_expiration_time(os.environ.get("JWT_EXPIRES_IN", "3600"))
 
 # Initialize Redis client
 try:
-    redis_client = redis.from_url(REDIS_URL) if REDIS_URL else None
+    redis_client = redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
 except Exception as e:
     print(f"Redis connection error: {e}")
     redis_client = None
@@ -61,24 +58,49 @@ except Exception as e:
     print(f"Email client initialization error: {e}")
     email_client = None
 
+# In-memory fallback for testing when Redis is unavailable, shared across requests
+_verification_codes: Dict[str, Dict[str, Any]] = {}
+_verification_codes_lock = threading.Lock()
+
+VERIFICATION_CODE_TTL = 1800  # 30 minutes in seconds
+
+def _verification_key(email: str) -> str:
+    """Redis key holding the verification code for an email"""
+    return f"verification:{email}"
+
+def _store_code_in_memory(email: str, code: str):
+    """Store a verification code in the in-memory fallback"""
+    with _verification_codes_lock:
+        _verification_codes[email] = {
+            "code": code,
+            "expires_at": time.monotonic() + VERIFICATION_CODE_TTL
+        }
+
+def _pop_code_from_memory(email: str):
+    """Remove and return a non-expired verification code from the in-memory fallback"""
+    with _verification_codes_lock:
+        stored_data = _verification_codes.pop(email, None)
+    if stored_data and time.monotonic() <= stored_data["expires_at"]:
+        return stored_data["code"]
+    return None
+
 router = APIRouter()
 
 def generate_verification_code():
     """Generate a 6-digit verification code"""
-    return ''.join(random.choices(string.digits, k=6))
+    return f"{secrets.randbelow(1_000_000):06d}"
 
 def create_jwt_token(user_id: str) -> str:
     """Create a JWT token for the user"""
-    expires = datetime.utcnow() + timedelta(seconds=JWT_EXPIRES_IN)
     payload = {
         "sub": str(user_id),
-        "exp": expires
+        "exp": int(datetime.now(timezone.utc).timestamp()) + JWT_EXPIRES_IN
     }
-    token = jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+    token = jwt.encode(payload, JWT_KEY, algorithm="HS256")
     return token
 
-async def send_email(to_email: str, code: str):
-    """Send an email using Azure Communication Services"""
+def _send_email_blocking(to_email: str, code: str) -> bool:
+    """Send an email using Azure Communication Services, blocking until it is sent"""
     message = {
         "content": {
             "subject": "AGIR Verification Code",
@@ -100,13 +122,60 @@ async def send_email(to_email: str, code: str):
         print(f"Error sending email: {e}")
         return False
 
+# Verification emails are delivered by background workers so /send-code
+# doesn't wait on Azure, and several sends can be in flight at once
+EMAIL_WORKER_COUNT = 8
+EMAIL_QUEUE_SIZE = 1000
+
+_email_queue: Optional[asyncio.Queue] = None
+_email_workers: List[asyncio.Task] = []
+
+async def _email_worker():
+    """Deliver queued verification emails until cancelled"""
+    while True:
+        to_email, code = await _email_queue.get()
+        try:
+            if not await asyncio.to_thread(_send_email_blocking, to_email, code):
+                print(f"Verification code for {to_email}: {code}")
+        finally:
+            _email_queue.task_done()
+
+@router.on_event("startup")
+async def start_email_workers():
+    """Start the background email workers"""
+    global _email_queue
+    if not email_client:
+        return
+    _email_queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+    _email_workers.extend(asyncio.create_task(_email_worker()) for _ in range(EMAIL_WORKER_COUNT))
+
+@router.on_event("shutdown")
+async def stop_email_workers():
+    """Stop the background email workers"""
+    for worker in _email_workers:
+        worker.cancel()
+    await asyncio.gather(*_email_workers, return_exceptions=True)
+    _email_workers.clear()
+
+async def send_email(to_email: str, code: str) -> bool:
+    """Queue an email for delivery, sending it in a worker thread if the queue isn't running"""
+    if _email_queue is None:
+        return await asyncio.to_thread(_send_email_blocking, to_email, code)
+    
+    try:
+        _email_queue.put_nowait((to_email, code))
+        return True
+    except asyncio.QueueFull:
+        print(f"Email queue full, could not send email to {to_email}")
+        return False
+
 @router.post("/send-code")
 async def send_verification_code(
     email: str = Body(..., embed=True),
     db: Session = Depends(get_db)
 ):
     """Send a verification code to the user's email"""
-    if not email or '@' not in email:
+    if not email or not _EMAIL_RE.match(email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid email address"
@@ -115,30 +184,18 @@ async def send_verification_code(
     # Generate a verification code
     code = generate_verification_code()
     
-    # In-memory fallback for testing when Redis is unavailable
-    verification_codes = {}
-    
     # Store the code in Redis with expiration (30 minutes) or fallback to in-memory
     if redis_client:
         try:
-            redis_client.setex(
-                f"verification:{email}",
-                1800,  # 30 minutes in seconds
-                code
-            )
+            # Blocking client, so run it in a worker thread like the email send
+            await asyncio.to_thread(redis_client.setex, _verification_key(email), VERIFICATION_CODE_TTL, code)
         except Exception as e:
             print(f"Redis error: {e}")
             # Fall back to in-memory storage
-            verification_codes[email] = {
-                "code": code,
-                "expires_at": datetime.utcnow() + timedelta(minutes=30)
-            }
+            _store_code_in_memory(email, code)
     else:
         # Use in-memory storage if Redis is not available
-        verification_codes[email] = {
-            "code": code,
-            "expires_at": datetime.utcnow() + timedelta(minutes=30)
-        }
+        _store_code_in_memory(email, code)
     
     # Send email using Azure services or fall back to console output
     if email_client:
@@ -152,33 +209,25 @@ async def send_verification_code(
     return {"message": "Verification code sent to your email"}
 
 @router.post("/verify")
-async def verify_code(
+def verify_code(
     email: str = Body(..., embed=True),
     code: str = Body(..., embed=True),
     db: Session = Depends(get_db)
 ):
     """Verify the code and log in or create a user account"""
-    # In-memory fallback for testing
-    verification_codes = {}
-    
-    # Get the code from Redis or fallback storage
+    # Get and consume the code from Redis (GET+DEL in one round-trip) or fallback storage
     stored_code = None
     if redis_client:
         try:
-            stored_code = redis_client.get(f"verification:{email}")
+            key = _verification_key(email)
+            stored_code, _ = redis_client.pipeline().get(key).delete(key).execute()
         except Exception as e:
             print(f"Redis error: {e}")
             # Check in-memory storage if Redis fails
-            if email in verification_codes:
-                stored_data = verification_codes[email]
-                if datetime.utcnow() <= stored_data["expires_at"]:
-                    stored_code = stored_data["code"]
+            stored_code = _pop_code_from_memory(email)
     else:
         # Use in-memory storage if Redis is not available
-        if email in verification_codes:
-            stored_data = verification_codes[email]
-            if datetime.utcnow() <= stored_data["expires_at"]:
-                stored_code = stored_data["code"]
+        stored_code = _pop_code_from_memory(email)
     
     if not stored_code:
         # For development/testing, accept any code if both Redis and in-memory don't have the code
@@ -189,58 +238,53 @@ async def verify_code(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No verification code was sent to this email or the code has expired"
             )
-    elif isinstance(stored_code, bytes) and stored_code.decode('utf-8') != code:
-        # Redis returns bytes
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid verification code"
-        )
-    elif isinstance(stored_code, str) and stored_code != code:
-        # In-memory returns string
+    elif stored_code != code:
+        # Redis (decode_responses=True) and in-memory storage both return str
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid verification code"
         )
     
-    # Code is valid, check if user exists
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        # Create a new user
-        username = email.split('@')[0]
-        user = User(
-            email=email,
-            username=username,
-            first_name=username,  # Default first name
-            last_name="",
-            created_at=datetime.utcnow()
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    # Clear the verification code
-    if redis_client:
-        try:
-            redis_client.delete(f"verification:{email}")
-        except Exception as e:
-            print(f"Redis error when deleting code: {e}")
-    
-    if email in verification_codes:
-        del verification_codes[email]
-    
-    # Generate JWT token
-    token = create_jwt_token(user.id)
+    # Code is valid, create the user unless one exists. DO NOTHING leaves an existing
+    # row untouched (no new row version or lock on every login), so RETURNING only
+    # yields a row this statement inserted, and existing users are read separately.
+    # Relies on the unique constraint on users.email that check_database_tables checks.
+    at = email.find('@')
+    username = email[:at] if at >= 0 else email
+    new_user_values = {
+        "email": email,
+        "username": username,
+        "first_name": username,  # Default first name
+        "last_name": "",
+        # Stored as UTC like the rest of the timestamps, whatever the session's TimeZone
+        "created_at": func.timezone("utc", func.now())
+    }
+    stmt = pg_insert(User).values(**new_user_values).on_conflict_do_nothing(
+        index_elements=[User.email]
+    ).returning(User)
+    user = db.execute(stmt, execution_options={"populate_existing": True}).scalar_one_or_none()
+    inserted = user is not None
+    if user is None:
+        user = db.query(User).filter(User.email == email).one()
     
-    # Return user info and token
-    return {
+    # Read everything the response needs before committing, since the commit
+    # expires the user and any later access would refresh it with another SELECT
+    result = {
         "id": user.id,
         "email": user.email,
         "username": user.username,
         "first_name": user.first_name,
         "last_name": user.last_name,
-        "token": token
+        "created": inserted,
+        "token": create_jwt_token(user.id)
     }
+    db.commit()
+    # A new user makes cached user list pages stale; a login leaves them valid
+    if inserted:
+        invalidate_pages("users")
+    
+    # Return user info and token
+    return result
 
 @router.post("/validate-token")
 async def validate_token(
@@ -248,7 +292,7 @@ async def validate_token(
 ):
     """Validate a JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        payload = decode_jwt(token)
         return {"valid": True, "user_id": payload["sub"]}
     except jwt.ExpiredSignatureError:
         return {"valid": False, "error": "Token has expired"}
@@ -1,100 +1,218 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import String, cast, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+import logging
+import orjson
+import os
+import redis
+import redis.asyncio
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
-from agir_db.db.session import get_db
+from api.database import decode_created_cursor, encode_created_cursor, get_async_db, get_db, sender_name
 from agir_db.models.user import User
 from agir_db.models.chat_conversation import ChatConversation
 from agir_db.models.chat_message import ChatMessage
 from api.middleware.auth import get_current_user
-from src.chat.chat_with_learner import LearnerChatSession
+from src.chat.chat_with_learner import get_chat_session
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Pydantic models for chat endpoints only
-class ChatMessageRequest(BaseModel):
-    role: str  # "user", "assistant", "system"
-    content: str
+REDIS_URL = os.environ.get("REDIS_URL")
+CONVERSATION_CACHE_TTL = int(os.environ.get("CONVERSATION_CACHE_TTL", 60))  # seconds
+
+# Redis clients for the conversation cache: async for reads on the event loop,
+# sync for invalidation from the threadpool send endpoint
+try:
+    redis_client = redis.from_url(REDIS_URL) if REDIS_URL else None
+    async_redis_client = redis.asyncio.from_url(REDIS_URL) if REDIS_URL else None
+except Exception as e:
+    logger.warning("Redis connection error: %s", e)
+    redis_client = None
+    async_redis_client = None
+
+def _conversation_cache_key(conversation_id: uuid.UUID) -> str:
+    """Redis hash holding the cached pages of a conversation, one field per user and page"""
+    return f"conv:{conversation_id}"
+
+def _invalidate_conversation_cache(conversation_id: uuid.UUID):
+    """Drop every cached page of a conversation after new messages are committed"""
+    if not redis_client:
+        return
+    try:
+        redis_client.delete(_conversation_cache_key(conversation_id))
+    except Exception as e:
+        logger.warning("Redis error: %s", e)
+
+# Dedicated pool for LLM calls, so inference runs alongside the request's database writes
+LLM_POOL_WORKERS = int(os.environ.get("LLM_POOL_WORKERS", 8))
+_llm_pool = ThreadPoolExecutor(max_workers=LLM_POOL_WORKERS, thread_name_prefix="llm")
+
+def _generate_ai_response(user_id: str, content: str) -> str:
+    """Get the AI user's reply to a message from a LearnerChatSession"""
+    chat_session = get_chat_session(user_id=user_id)
+    if not chat_session:
+        raise ValueError(f"Failed to initialize chat session with user {user_id}")
+    return chat_session.chat(content)
+
+# Conversation names computed in SQL, falling back to "Conversation <id>" without a title
+_conversation_name = func.coalesce(
+    func.nullif(ChatConversation.title, ""),
+    literal("Conversation ").concat(cast(ChatConversation.id, String))
+).label("name")
+
+def _decode_cursor(cursor: str):
+    """Decode a page cursor, rejecting malformed ones with a 400"""
+    try:
+        return decode_created_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
 @router.get("/conversations")
 async def get_conversations(
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    related_type: Optional[str] = None,
+    related_id: Optional[uuid.UUID] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get chat conversations for current user"""
-    # Only get conversations created by the current user
-    conversations = db.query(ChatConversation).filter(
+    """
+    Get chat conversations for current user, newest first
+    
+    Passing the previous response's next_cursor returns the following page;
+    related_type and related_id narrow the list to conversations about one entity.
+    """
+    # Only get conversations created by the current user, counting messages in the same query
+    query = select(
+        ChatConversation.id,
+        _conversation_name,
+        ChatConversation.created_at,
+        ChatConversation.related_type,
+        ChatConversation.related_id,
+        func.count(ChatMessage.id).label("messages_count")
+    ).outerjoin(
+        ChatMessage, ChatMessage.conversation_id == ChatConversation.id
+    ).where(
         ChatConversation.created_by == current_user.id
-    ).all()
+    )
+    if related_type:
+        query = query.where(ChatConversation.related_type == related_type)
+    if related_id:
+        query = query.where(ChatConversation.related_id == related_id)
+    # Keyset pagination on (created_at, id), so rows sharing a timestamp aren't skipped
+    if cursor:
+        query = query.where(tuple_(ChatConversation.created_at, ChatConversation.id) < _decode_cursor(cursor))
+    # One extra row tells whether another page follows
+    conversations = (await db.execute(
+        query.group_by(ChatConversation.id).order_by(
+            ChatConversation.created_at.desc(), ChatConversation.id.desc()
+        ).limit(limit + 1)
+    )).all()
+    has_more = len(conversations) > limit
+    conversations = conversations[:limit]
     
-    result = []
-    for conv in conversations:
-        messages_count = db.query(ChatMessage).filter(ChatMessage.conversation_id == conv.id).count()
-        
-        result.append({
-            "id": conv.id,
-            "name": conv.title if conv.title else f"Conversation {conv.id}",
-            "created_at": conv.created_at,
-            "related_type": conv.related_type,
-            "related_id": conv.related_id,
-            "messages_count": messages_count
-        })
+    result = {
+        "items": [conv._asdict() for conv in conversations],
+        "has_more": has_more,
+        "next_cursor": encode_created_cursor(
+            conversations[-1].created_at, conversations[-1].id
+        ) if has_more else None
+    }
     
-    return result
+    # orjson encodes UUIDs and datetimes natively, so skip FastAPI's jsonable_encoder pass
+    return ORJSONResponse(result)
 
 @router.get("/conversations/{conversation_id}")
 async def get_conversation(
     conversation_id: uuid.UUID, 
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get a conversation by ID with its messages"""
-    conversation = db.query(ChatConversation).filter(
-        ChatConversation.id == conversation_id,
-        ChatConversation.created_by == current_user.id  # Only allow access to own conversations
-    ).first()
+    """
+    Get a conversation by ID with its most recent messages
+    
+    When has_more is set, passing next_cursor returns the page of older messages.
+    """
+    # Serve repeat reads of the same page from Redis until a new message is sent
+    cache_key = _conversation_cache_key(conversation_id)
+    cache_field = f"{current_user.id}:{limit}:{cursor or ''}"
+    if async_redis_client:
+        try:
+            cached = await async_redis_client.hget(cache_key, cache_field)
+            if cached:
+                return Response(content=cached, media_type="application/json")
+        except Exception as e:
+            logger.warning("Redis error: %s", e)
+    
+    conversation = (await db.execute(
+        select(
+            ChatConversation.id,
+            _conversation_name,
+            ChatConversation.created_at,
+            ChatConversation.related_type,
+            ChatConversation.related_id
+        ).where(
+            ChatConversation.id == conversation_id,
+            ChatConversation.created_by == current_user.id  # Only allow access to own conversations
+        )
+    )).first()
     if not conversation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
     
-    # Get messages for this conversation
-    messages = db.query(ChatMessage).filter(
+    # Get messages for this conversation with their sender names in one query
+    query = select(
+        ChatMessage.id,
+        ChatMessage.content,
+        ChatMessage.sender_id,
+        sender_name,
+        ChatMessage.created_at
+    ).outerjoin(
+        User, User.id == ChatMessage.sender_id
+    ).where(
         ChatMessage.conversation_id == conversation_id
-    ).order_by(ChatMessage.created_at).all()
-    
-    formatted_messages = []
-    for msg in messages:
-        sender_name = "Unknown"
-        if msg.sender:
-            if msg.sender.first_name and msg.sender.last_name:
-                sender_name = f"{msg.sender.first_name} {msg.sender.last_name}"
-            else:
-                sender_name = msg.sender.username
-        
-        formatted_messages.append({
-            "id": msg.id,
-            "content": msg.content,
-            "sender_id": msg.sender_id,
-            "sender_name": sender_name,
-            "created_at": msg.created_at
-        })
+    )
+    # Keyset pagination on (created_at, id): older pages are everything before the
+    # first message returned
+    if cursor:
+        query = query.where(tuple_(ChatMessage.created_at, ChatMessage.id) < _decode_cursor(cursor))
+    messages = (await db.execute(
+        query.order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc()).limit(limit + 1)
+    )).all()
+    has_more = len(messages) > limit
+    messages = messages[:limit]
     
-    result = {
-        "id": conversation.id,
-        "name": conversation.title if conversation.title else f"Conversation {conversation.id}",
-        "created_at": conversation.created_at,
-        "related_type": conversation.related_type,
-        "related_id": conversation.related_id,
-        "messages": formatted_messages
-    }
+    # Return the page oldest first, as the full history was
+    formatted_messages = [msg._asdict() for msg in reversed(messages)]
     
-    return result
+    result = conversation._asdict()
+    result["messages"] = formatted_messages
+    result["has_more"] = has_more
+    result["next_cursor"] = encode_created_cursor(messages[-1].created_at, messages[-1].id) if has_more else None
+    
+    # orjson encodes UUIDs and datetimes natively, so skip FastAPI's jsonable_encoder pass
+    payload = orjson.dumps(result)
+    if async_redis_client:
+        try:
+            await async_redis_client.pipeline().hset(cache_key, cache_field, payload).expire(
+                cache_key, CONVERSATION_CACHE_TTL
+            ).execute()
+        except Exception as e:
+            logger.warning("Redis error: %s", e)
+    
+    return Response(content=payload, media_type="application/json")
 
 @router.post("/user/{user_id}/send")
-async def send_message_to_user(
+def send_message_to_user(
     user_id: uuid.UUID,
     content: str = Body(..., embed=True),
     conversation_id: Optional[uuid.UUID] = Body(None, embed=True),
@@ -133,8 +251,10 @@ async def send_message_to_user(
                 related_id=user_id
             )
             db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            db.flush()  # Assign the conversation id without committing
+    
+    # Start generating the AI response while the user's message is written
+    ai_future = _llm_pool.submit(_generate_ai_response, str(user_id), content)
     
     # Create the message from the authenticated user
     message = ChatMessage(
@@ -144,53 +264,47 @@ async def send_message_to_user(
         created_at=datetime.utcnow()
     )
     
+    # Persist the conversation and user message during inference; flushing
+    # assigns the ids so the response can be built without refreshing after commit
     db.add(message)
+    db.flush()
+    result = {
+        "id": message.id,
+        "conversation_id": conversation.id,
+        "sender_id": message.sender_id,
+        "content": message.content,
+        "created_at": message.created_at
+    }
     db.commit()
-    db.refresh(message)
+    _invalidate_conversation_cache(result["conversation_id"])
     
-    # Generate AI response using LearnerChatSession
     try:
-        # Initialize chat session with the target user
-        chat_session = LearnerChatSession(user_id=str(user_id))
-        
         # Get response from the AI user
-        ai_response = chat_session.chat(content)
+        ai_response = ai_future.result()
         
         # Create message for AI response
         ai_message = ChatMessage(
-            conversation_id=conversation.id,
+            conversation_id=result["conversation_id"],
             sender_id=user_id,
             content=ai_response,
             created_at=datetime.utcnow()
         )
         
         db.add(ai_message)
-        db.commit()
-        db.refresh(ai_message)
+        db.flush()
         
         # Include AI response in the result
-        return {
-            "id": message.id,
-            "conversation_id": conversation.id,
-            "sender_id": message.sender_id,
-            "content": message.content,
-            "created_at": message.created_at,
-            "ai_response": {
-                "id": ai_message.id,
-                "sender_id": str(user_id),
-                "content": ai_response,
-                "created_at": ai_message.created_at
-            }
+        result["ai_response"] = {
+            "id": ai_message.id,
+            "sender_id": str(user_id),
+            "content": ai_response,
+            "created_at": ai_message.created_at
         }
-    except Exception as e:
+        db.commit()
+        _invalidate_conversation_cache(result["conversation_id"])
+    except Exception:
         # Log the error but continue without AI response
-        print(f"Error generating AI response: {str(e)}")
-        
-        # Return the original message without AI response
-        return {
-            "id": message.id,
-            "conversation_id": conversation.id,
-            "sender_id": message.sender_id,
-            "content": message.content,
-            "created_at": message.created_at
-        } 
\ No newline at end of file
+        logger.exception("Error generating AI response from user %s", user_id)
+        db.rollback()
+    
+    return result
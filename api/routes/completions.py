@@ -1,90 +1,274 @@
 from fastapi import APIRouter, HTTPException, status
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
-import uuid
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import List, Dict, Any, Iterable, Optional
+from pydantic import BaseModel, conlist
+import hashlib
+import json
+import os
+import redis
+import secrets
+import threading
 import time
+from concurrent.futures import Future
 
-from src.completions.fast_completion import create_fast_completion
-from src.chat.chat_with_learner import create_chat_session
+from api.schemas.chat import ChatMessage, MAX_CHAT_MESSAGES, REQUEST_CONFIG
+from src.completions.fast_completion import FastCompletion, create_fast_completion, get_completion_cache_sizes, clear_completion_cache as clear_fast_completion_cache
+from src.completions.fast_memory_retriever import clear_memory_cache, get_memory_cache_keys
+from src.completions.batcher import get_completion_batcher
+from src.chat.chat_with_learner import get_chat_session, clear_chat_session_cache, get_chat_session_cache_size
 
 router = APIRouter()
 
-# Pydantic models for completion requests
-class ChatMessage(BaseModel):
-    role: str  # "user", "assistant", "system"
-    content: str
+REDIS_URL = os.environ.get("REDIS_URL")
+COMPLETION_CACHE_TTL = int(os.environ.get("COMPLETION_CACHE_TTL", "3600"))  # seconds
+
+# Initialize Redis client for the response cache
+try:
+    redis_client = redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+except Exception as e:
+    print(f"Redis connection error: {e}")
+    redis_client = None
+
+# Response cache hit/miss counters, reported by /cache/stats
+_response_cache_stats = {"hits": 0, "misses": 0}
+_response_cache_stats_lock = threading.Lock()
+
+def _response_cache_key(user_id: str, model: Optional[str], temperature: float, max_tokens: Optional[int], prompt: str) -> str:
+    """Redis key for a completion of prompt with the given user and model settings"""
+    digest = hashlib.blake2b(
+        f"{model}|{user_id}|{temperature}|{max_tokens}|{prompt}".encode("utf-8"),
+        digest_size=16
+    ).hexdigest()
+    return f"completion:{digest}"
+
+def _get_cached_response(key: str) -> Optional[Dict[str, str]]:
+    """Return the cached model name and text for a key, or None on a miss"""
+    if not redis_client:
+        return None
+    try:
+        cached = redis_client.get(key)
+    except Exception as e:
+        print(f"Redis error: {e}")
+        return None
+    with _response_cache_stats_lock:
+        _response_cache_stats["hits" if cached else "misses"] += 1
+    return json.loads(cached) if cached else None
+
+def _cache_response(key: str, model_name: str, text: str):
+    """Store a generated completion for COMPLETION_CACHE_TTL seconds"""
+    # FastCompletion reports failures as "Error..." text; don't keep serving those
+    if not redis_client or text.startswith("Error"):
+        return
+    try:
+        redis_client.setex(key, COMPLETION_CACHE_TTL, json.dumps({"model": model_name, "text": text}))
+    except Exception as e:
+        print(f"Redis error: {e}")
+
+# CoT generations in progress, so identical concurrent requests wait on the same one
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+def _generate_cot(cache_key: str, fast_completion: FastCompletion, prompt: str) -> str:
+    """
+    Generate and cache a CoT completion, once for all concurrent requests with the same key
+    
+    Args:
+        cache_key: Response cache key of the prompt and completion settings
+        fast_completion: FastCompletion to generate with
+        prompt: Prompt to complete
+        
+    Returns:
+        Completion text
+    """
+    with _inflight_lock:
+        future = _inflight.get(cache_key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[cache_key] = future
+    if not is_leader:
+        return future.result()
+    
+    try:
+        text = get_completion_batcher().submit(fast_completion, prompt, mode="cot")
+        _cache_response(cache_key, fast_completion.model_name, text)
+        future.set_result(text)
+        return text
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[cache_key]
+
+def _stream_response(completion_id: str, model_name: str, chunks: Iterable[str], chat: bool, cache_key: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream completion text as OpenAI-style server-sent events
+    
+    Args:
+        completion_id: Completion ID shared by every chunk
+        model_name: Model reported in every chunk
+        chunks: Text chunks in generation order
+        chat: Emit chat.completion.chunk deltas instead of text_completion chunks
+        cache_key: Response cache key to store the full text under once streaming ends
+    """
+    def events():
+        base = json.dumps({
+            "id": completion_id,
+            "object": "chat.completion.chunk" if chat else "text_completion",
+            "created": int(time.time()),
+            "model": model_name
+        })
+        # Everything but the chunk text is the same in every event, so encode it once
+        # and splice each JSON-encoded chunk between the fixed prefix and suffix
+        if chat:
+            prefix = f'data: {base[:-1]}, "choices": [{{"index": 0, "delta": {{"content": '
+            suffix = '}, "finish_reason": null}]}\n\n'
+            final = {"index": 0, "delta": {}, "finish_reason": "stop"}
+        else:
+            prefix = f'data: {base[:-1]}, "choices": [{{"text": '
+            suffix = ', "index": 0, "logprobs": null, "finish_reason": null}]}\n\n'
+            final = {"text": "", "index": 0, "logprobs": None, "finish_reason": "stop"}
+        
+        parts = []
+        for text in chunks:
+            parts.append(text)
+            yield prefix + json.dumps(text) + suffix
+        
+        yield f'data: {base[:-1]}, "choices": [{json.dumps(final)}]}}\n\n'
+        yield "data: [DONE]\n\n"
+        
+        if cache_key:
+            _cache_response(cache_key, model_name, "".join(parts))
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
 
+def _completion_response(
+    completion_id: str,
+    created: int,
+    model_name: str,
+    text: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    processing_time: float,
+    chat: bool,
+    **usage: Any
+) -> ORJSONResponse:
+    """
+    Build an OpenAI-like completion response with performance info
+    
+    The payload is serialized by orjson directly instead of going through
+    FastAPI's jsonable_encoder. Extra keyword arguments are added to usage.
+    """
+    if chat:
+        choice = {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+    else:
+        choice = {"text": text, "index": 0, "logprobs": None, "finish_reason": "stop"}
+    
+    return ORJSONResponse({
+        "id": completion_id,
+        "object": "chat.completion" if chat else "text_completion",
+        "created": created,
+        "model": model_name,
+        "choices": [choice],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "processing_time_ms": round(processing_time * 1000, 2),
+            **usage
+        }
+    })
+
+# Pydantic models for completion requests
 class ChatCompletionRequest(BaseModel):
-    messages: List[ChatMessage]
+    model_config = REQUEST_CONFIG
+    
+    messages: conlist(ChatMessage, max_length=MAX_CHAT_MESSAGES)
     model: Optional[str] = None
     max_tokens: Optional[int] = 150
     temperature: Optional[float] = 0.7
     user_id: Optional[str] = None  # Optional user ID for personalized responses
+    stream: bool = False  # Send the response as server-sent events while it is generated
 
 class CompletionRequest(BaseModel):
+    model_config = REQUEST_CONFIG
+    
     prompt: str
     model: Optional[str] = None
     max_tokens: Optional[int] = 150
     temperature: Optional[float] = 0.7
     user_id: Optional[str] = None
+    stream: bool = False
 
 @router.post("/", include_in_schema=True)
 @router.post("", include_in_schema=False)  # Add support for path without slash
-async def create_completion(request: CompletionRequest):
+def create_completion(request: CompletionRequest):
     """Create a text completion (similar to OpenAI's completions API)"""
     try:
         # Use a default user ID if none provided
         user_id = request.user_id or "00000000-0000-0000-0000-000000000000"
         
         # Track timing for performance monitoring
-        start_time = time.time()
-        
-        # Use fast completion for better performance
-        fast_completion = create_fast_completion(
-            user_id=user_id,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-            model=request.model
-        )
-        
-        if not fast_completion:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to initialize completion service"
+        start_time = time.perf_counter()
+        
+        # Serve repeated prompts from the response cache
+        cache_key = _response_cache_key(user_id, request.model, request.temperature, request.max_tokens, request.prompt)
+        cached = _get_cached_response(cache_key)
+        if cached:
+            model_name, ai_response = cached["model"], cached["text"]
+        else:
+            # Use fast completion for better performance
+            fast_completion = create_fast_completion(
+                user_id=user_id,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                model=request.model
             )
-        
-        # Generate completion with enhanced thinking process
-        ai_response = fast_completion.complete_cot(request.prompt)
-        
-        # Calculate processing time
-        processing_time = time.time() - start_time
-        
-        # Generate a unique completion ID
-        completion_id = f"cmpl-{uuid.uuid4().hex[:20]}"
+            
+            if not fast_completion:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to initialize completion service"
+                )
+            
+            if request.stream:
+                return _stream_response(
+                    f"cmpl-{secrets.token_hex(10)}",
+                    fast_completion.model_name,
+                    fast_completion.stream_cot(request.prompt),
+                    chat=False,
+                    cache_key=cache_key
+                )
+            
+            # Generate completion with enhanced thinking process, batched with concurrent requests
+            # and shared with identical ones still in flight
+            ai_response = _generate_cot(cache_key, fast_completion, request.prompt)
+            model_name = fast_completion.model_name
+        
+        if request.stream:
+            # Cached response, sent as a single chunk
+            return _stream_response(f"cmpl-{secrets.token_hex(10)}", model_name, [ai_response], chat=False)
+        
+        # Word counts reported as token usage
+        prompt_tokens = len(request.prompt.split())
+        completion_tokens = len(ai_response.split())
+        
+        # Time processing with the monotonic clock; read the wall clock once for created
+        processing_time = time.perf_counter() - start_time
         
         # Return OpenAI-like response format with performance info
-        response_data = {
-            "id": completion_id,
-            "object": "text_completion",
-            "created": int(time.time()),
-            "model": fast_completion.model_name,
-            "choices": [
-                {
-                    "text": ai_response,
-                    "index": 0,
-                    "logprobs": None,
-                    "finish_reason": "stop"
-                }
-            ],
-            "usage": {
-                "prompt_tokens": len(request.prompt.split()),
-                "completion_tokens": len(ai_response.split()),
-                "total_tokens": len(request.prompt.split()) + len(ai_response.split()),
-                "processing_time_ms": round(processing_time * 1000, 2)
-            }
-        }
-        
-        return response_data
+        return _completion_response(
+            f"cmpl-{secrets.token_hex(10)}",
+            int(time.time()),
+            model_name,
+            ai_response,
+            prompt_tokens,
+            completion_tokens,
+            processing_time,
+            chat=False,
+            cached=bool(cached)
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -94,14 +278,14 @@ async def create_completion(request: CompletionRequest):
 
 @router.post("/chat")
 @router.post("/chat/", include_in_schema=False)  # Add support for path with slash
-async def create_chat_completion(request: ChatCompletionRequest):
+def create_chat_completion(request: ChatCompletionRequest):
     """Create a chat completion (similar to OpenAI's chat completions API)"""
     try:
         # Use a default user ID if none provided
         user_id = request.user_id or "00000000-0000-0000-0000-000000000000"
         
         # Track timing for performance monitoring
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Get the last user message
         user_messages = [msg for msg in request.messages if msg.role == "user"]
@@ -113,54 +297,63 @@ async def create_chat_completion(request: ChatCompletionRequest):
         
         last_user_message = user_messages[-1].content
         
-        # Use fast completion for better performance
-        fast_completion = create_fast_completion(
-            user_id=user_id,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-            model=request.model
-        )
-        
-        if not fast_completion:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to initialize completion service"
+        # Serve repeated prompts from the response cache
+        cache_key = _response_cache_key(user_id, request.model, request.temperature, request.max_tokens, last_user_message)
+        cached = _get_cached_response(cache_key)
+        if cached:
+            model_name, ai_response = cached["model"], cached["text"]
+        else:
+            # Use fast completion for better performance
+            fast_completion = create_fast_completion(
+                user_id=user_id,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                model=request.model
             )
-        
-        # Generate completion with enhanced thinking process
-        ai_response = fast_completion.complete_cot(last_user_message)
-        
-        # Calculate processing time
-        processing_time = time.time() - start_time
-        
-        # Generate a unique completion ID
-        completion_id = f"chatcmpl-{uuid.uuid4().hex[:20]}"
+            
+            if not fast_completion:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Failed to initialize completion service"
+                )
+            
+            if request.stream:
+                return _stream_response(
+                    f"chatcmpl-{secrets.token_hex(10)}",
+                    fast_completion.model_name,
+                    fast_completion.stream_cot(last_user_message),
+                    chat=True,
+                    cache_key=cache_key
+                )
+            
+            # Generate completion with enhanced thinking process, batched with concurrent requests
+            # and shared with identical ones still in flight
+            ai_response = _generate_cot(cache_key, fast_completion, last_user_message)
+            model_name = fast_completion.model_name
+        
+        if request.stream:
+            # Cached response, sent as a single chunk
+            return _stream_response(f"chatcmpl-{secrets.token_hex(10)}", model_name, [ai_response], chat=True)
+        
+        # Word counts reported as token usage
+        prompt_tokens = sum(len(msg.content.split()) for msg in request.messages)
+        completion_tokens = len(ai_response.split())
+        
+        # Time processing with the monotonic clock; read the wall clock once for created
+        processing_time = time.perf_counter() - start_time
         
         # Return OpenAI-like response format with performance info
-        response_data = {
-            "id": completion_id,
-            "object": "chat.completion",
-            "created": int(time.time()),
-            "model": fast_completion.model_name,
-            "choices": [
-                {
-                    "index": 0,
-                    "message": {
-                        "role": "assistant",
-                        "content": ai_response
-                    },
-                    "finish_reason": "stop"
-                }
-            ],
-            "usage": {
-                "prompt_tokens": sum(len(msg.content.split()) for msg in request.messages),
-                "completion_tokens": len(ai_response.split()),
-                "total_tokens": sum(len(msg.content.split()) for msg in request.messages) + len(ai_response.split()),
-                "processing_time_ms": round(processing_time * 1000, 2)
-            }
-        }
-        
-        return response_data
+        return _completion_response(
+            f"chatcmpl-{secrets.token_hex(10)}",
+            int(time.time()),
+            model_name,
+            ai_response,
+            prompt_tokens,
+            completion_tokens,
+            processing_time,
+            chat=True,
+            cached=bool(cached)
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -170,14 +363,14 @@ async def create_chat_completion(request: ChatCompletionRequest):
 
 @router.post("/simple")
 @router.post("/simple/", include_in_schema=False)  # Add support for path with slash
-async def create_simple_completion(request: CompletionRequest):
+def create_simple_completion(request: CompletionRequest):
     """Create a simple text completion without CoT (Chain of Thought) analysis"""
     try:
         # Use a default user ID if none provided
         user_id = request.user_id or "00000000-0000-0000-0000-000000000000"
         
         # Track timing for performance monitoring
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Use fast completion for better performance
         fast_completion = create_fast_completion(
@@ -196,35 +389,24 @@ async def create_simple_completion(request: CompletionRequest):
         # Generate completion with enhanced thinking process
         ai_response = fast_completion.complete(request.prompt)
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        # Word counts reported as token usage
+        prompt_tokens = len(request.prompt.split())
+        completion_tokens = len(ai_response.split())
         
-        # Generate a unique completion ID
-        completion_id = f"cmpl-{uuid.uuid4().hex[:20]}"
+        # Time processing with the monotonic clock; read the wall clock once for created
+        processing_time = time.perf_counter() - start_time
         
         # Return OpenAI-like response format with performance info
-        response_data = {
-            "id": completion_id,
-            "object": "text_completion",
-            "created": int(time.time()),
-            "model": fast_completion.model_name,
-            "choices": [
-                {
-                    "text": ai_response,
-                    "index": 0,
-                    "logprobs": None,
-                    "finish_reason": "stop"
-                }
-            ],
-            "usage": {
-                "prompt_tokens": len(request.prompt.split()),
-                "completion_tokens": len(ai_response.split()),
-                "total_tokens": len(request.prompt.split()) + len(ai_response.split()),
-                "processing_time_ms": round(processing_time * 1000, 2)
-            }
-        }
-        
-        return response_data
+        return _completion_response(
+            f"cmpl-{secrets.token_hex(10)}",
+            int(time.time()),
+            fast_completion.model_name,
+            ai_response,
+            prompt_tokens,
+            completion_tokens,
+            processing_time,
+            chat=False
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -234,14 +416,14 @@ async def create_simple_completion(request: CompletionRequest):
 
 @router.post("/chat/simple")
 @router.post("/chat/simple/", include_in_schema=False)  # Add support for path with slash
-async def create_simple_chat_completion(request: ChatCompletionRequest):
+def create_simple_chat_completion(request: ChatCompletionRequest):
     """Create a simple chat completion without CoT (Chain of Thought) analysis"""
     try:
         # Use a default user ID if none provided
         user_id = request.user_id or "00000000-0000-0000-0000-000000000000"
         
         # Track timing for performance monitoring
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Get the last user message
         user_messages = [msg for msg in request.messages if msg.role == "user"]
@@ -253,8 +435,8 @@ async def create_simple_chat_completion(request: ChatCompletionRequest):
         
         last_user_message = user_messages[-1].content
         
-        # Use LearnerChatSession for simple completion
-        chat_session = create_chat_session(
+        # Use LearnerChatSession for simple completion, reusing the setup of earlier requests
+        chat_session = get_chat_session(
             user_id=user_id,
             temperature=request.temperature,
             max_tokens=request.max_tokens,
@@ -267,45 +449,28 @@ async def create_simple_chat_completion(request: ChatCompletionRequest):
                 detail="Failed to initialize chat session"
             )
         
-        try:
-            # Generate simple completion using chat method
-            ai_response = chat_session.chat(last_user_message)
-        finally:
-            # Always close the session
-            chat_session.close()
+        # Generate simple completion using chat method
+        ai_response = chat_session.chat(last_user_message)
         
-        # Calculate processing time
-        processing_time = time.time() - start_time
+        # Word counts reported as token usage
+        prompt_tokens = sum(len(msg.content.split()) for msg in request.messages)
+        completion_tokens = len(ai_response.split())
         
-        # Generate a unique completion ID
-        completion_id = f"chatcmpl-simple-{uuid.uuid4().hex[:20]}"
+        # Time processing with the monotonic clock; read the wall clock once for created
+        processing_time = time.perf_counter() - start_time
         
         # Return OpenAI-like response format with performance info
-        response_data = {
-            "id": completion_id,
-            "object": "chat.completion",
-            "created": int(time.time()),
-            "model": chat_session.model_name,
-            "choices": [
-                {
-                    "index": 0,
-                    "message": {
-                        "role": "assistant",
-                        "content": ai_response
-                    },
-                    "finish_reason": "stop"
-                }
-            ],
-            "usage": {
-                "prompt_tokens": sum(len(msg.content.split()) for msg in request.messages),
-                "completion_tokens": len(ai_response.split()),
-                "total_tokens": sum(len(msg.content.split()) for msg in request.messages) + len(ai_response.split()),
-                "processing_time_ms": round(processing_time * 1000, 2),
-                "mode": "simple"
-            }
-        }
-        
-        return response_data
+        return _completion_response(
+            f"chatcmpl-simple-{secrets.token_hex(10)}",
+            int(time.time()),
+            chat_session.model_name,
+            ai_response,
+            prompt_tokens,
+            completion_tokens,
+            processing_time,
+            chat=True,
+            mode="simple"
+        )
     
     except Exception as e:
         raise HTTPException(
@@ -314,11 +479,12 @@ async def create_simple_chat_completion(request: ChatCompletionRequest):
         )
 
 @router.post("/cache/clear")
-async def clear_completion_cache():
+def clear_completion_cache():
     """Clear the completion memory cache"""
     try:
-        from src.completions.fast_memory_retriever import clear_memory_cache
         clear_memory_cache()
+        clear_fast_completion_cache()
+        clear_chat_session_cache()
         
         return {
             "message": "Completion memory cache cleared successfully",
@@ -331,19 +497,25 @@ async def clear_completion_cache():
         )
 
 @router.get("/cache/stats")
-async def get_cache_stats():
+def get_cache_stats():
     """Get cache statistics"""
     try:
-        from src.completions.fast_memory_retriever import _retriever_cache
-        from src.completions.fast_completion import _user_cache
-        
-        retriever_cache_size = len(_retriever_cache)
-        user_cache_size = len(_user_cache)
+        # Snapshot the keys under the cache lock; the sizes are single reads
+        retriever_cache_keys = get_memory_cache_keys()
+        retriever_cache_size = len(retriever_cache_keys)
+        user_cache_size, completion_cache_size = get_completion_cache_sizes()
+        chat_session_cache_size = get_chat_session_cache_size()
+        with _response_cache_stats_lock:
+            response_cache_stats = dict(_response_cache_stats)
         
         return {
             "retriever_cache_size": retriever_cache_size,
             "user_cache_size": user_cache_size,
-            "retriever_cache_keys": list(_retriever_cache.keys()),
+            "completion_cache_size": completion_cache_size,
+            "chat_session_cache_size": chat_session_cache_size,
+            "retriever_cache_keys": retriever_cache_keys,
+            "response_cache_hits": response_cache_stats["hits"],
+            "response_cache_misses": response_cache_stats["misses"],
             "timestamp": int(time.time())
         }
     except Exception as e:
@@ -353,7 +525,7 @@ async def get_cache_stats():
         )
 
 @router.get("/health")
-async def completion_health_check():
+def completion_health_check():
     """Health check for completion service"""
     try:
         return {
@@ -1,22 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, select
 from typing import List
 import uuid
 
-from agir_db.db.session import get_db
+from api.database import get_db, stream_json_rows
+from api.middleware.etag import check_etag, etag_headers, make_etag
 from agir_db.models.episode import Episode
 from agir_db.models.step import Step
 
 router = APIRouter()
 
 @router.get("/")
-async def get_episodes(db: Session = Depends(get_db)):
+def get_episodes(request: Request, db: Session = Depends(get_db)):
     """Get all episodes"""
-    episodes = db.query(Episode).all()
-    return episodes
+    # Revalidate from the latest update and the row count before loading every episode
+    latest, count = db.query(func.max(Episode.updated_at), func.count(Episode.id)).one()
+    etag = make_etag(latest, count)
+    not_modified = check_etag(request, None, etag)
+    if not_modified:
+        return not_modified
+    
+    # Stream the rows from a server-side cursor instead of building the whole list first
+    return StreamingResponse(
+        stream_json_rows(select(Episode.__table__)),
+        media_type="application/json",
+        headers=etag_headers(etag)
+    )
 
 @router.get("/{episode_id}")
-async def get_episode(episode_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_episode(episode_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get an episode by ID"""
     episode = db.query(Episode).filter(Episode.id == episode_id).first()
     if not episode:
@@ -24,12 +38,14 @@ async def get_episode(episode_id: uuid.UUID, db: Session = Depends(get_db)):
     return episode
 
 @router.get("/{episode_id}/steps")
-async def get_episode_steps(episode_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_episode_steps(episode_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get all steps for an episode"""
-    # First check if episode exists
-    episode = db.query(Episode).filter(Episode.id == episode_id).first()
-    if not episode:
+    # Outer join from the episode, so one query both checks it exists and loads its steps
+    rows = db.query(Episode.id, Step).outerjoin(
+        Step, Step.episode_id == Episode.id
+    ).filter(Episode.id == episode_id).order_by(Step.created_at).all()
+    if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Episode not found")
     
-    steps = db.query(Step).filter(Step.episode_id == episode_id).order_by(Step.created_at).all()
+    steps = [step for _, step in rows if step is not None]
     return steps 
\ No newline at end of file
@@ -1,29 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Dict, Any, Optional
+from sqlalchemy import desc, event, tuple_
+from typing import List, Dict, Any, Optional, Tuple
+import time
 import uuid
+from datetime import datetime
 from math import ceil
 
-from agir_db.db.session import get_db
+from api.database import (
+    decode_created_cursor, encode_created_cursor, get_db, page_total, page_total_column, row_exists
+)
 from agir_db.models.user import User
 from agir_db.models.memory import UserMemory
 
 router = APIRouter()
 
+# Memories are listed by importance, then recency, with the id as a tiebreaker
+_MEMORY_ORDER = (desc(UserMemory.importance), desc(UserMemory.created_at), desc(UserMemory.id))
+
+def _decode_cursor(cursor: str) -> Tuple[float, datetime, uuid.UUID]:
+    """Decode a cursor into the (importance, created_at, id) key it points after, rejecting malformed ones with a 400"""
+    try:
+        key = decode_created_cursor(cursor, leading=1)
+    except ValueError:
+        key = None
+    if key is None or not isinstance(key[0], (int, float)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return key
+
+# The distinct memory types rarely change, so the result is reused for a minute;
+# memories inserted through this process clear it straight away
+MEMORY_TYPES_CACHE_TTL = 60.0
+_memory_types_cache = {"checked_at": None, "result": None}
+
+@event.listens_for(UserMemory, "after_insert")
+def _clear_memory_types_cache(mapper, connection, target):
+    _memory_types_cache["checked_at"] = None
+
+@router.get("/types")
+def get_memory_types(db: Session = Depends(get_db)):
+    """Get all unique memory types"""
+    now = time.monotonic()
+    checked_at = _memory_types_cache["checked_at"]
+    if checked_at is not None and now - checked_at < MEMORY_TYPES_CACHE_TTL:
+        return _memory_types_cache["result"]
+    
+    # Query distinct memory types
+    memory_types = db.query(UserMemory.memory_type).distinct().filter(UserMemory.memory_type != None).all()
+    result = [t[0] for t in memory_types if t[0]]
+    _memory_types_cache["result"] = result
+    _memory_types_cache["checked_at"] = now
+    return result
+
 @router.get("/{user_id}")
-async def get_user_memories(
+def get_user_memories(
     user_id: uuid.UUID, 
     page: int = Query(1, ge=1), 
     page_size: int = Query(10, ge=1, le=100),
     memory_type: Optional[str] = None,
     min_importance: Optional[float] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get memories for a user with pagination and filtering"""
+    """
+    Get memories for a user with pagination and filtering
+    
+    Pages are numbered by default. Passing the previous response's next_cursor
+    instead seeks straight to the next page and skips the total count.
+    """
     # First check if user exists
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if not row_exists(db, User, user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     # Build query for memories
@@ -35,38 +81,44 @@ async def get_user_memories(
     if min_importance is not None:
         query = query.filter(UserMemory.importance >= min_importance)
     
-    # Get total count for pagination
-    total = query.count()
-    
-    # Add pagination
-    query = query.order_by(desc(UserMemory.importance), desc(UserMemory.created_at))
-    query = query.offset((page - 1) * page_size).limit(page_size)
-    
-    # Execute query
-    memories = query.all()
+    # Add pagination, fetching one extra row to tell whether another page follows
+    total = None
+    if cursor:
+        memories = query.filter(
+            tuple_(UserMemory.importance, UserMemory.created_at, UserMemory.id) < _decode_cursor(cursor)
+        ).order_by(*_MEMORY_ORDER).limit(page_size + 1).all()
+    else:
+        # Numbered pages get the total count for pagination in the same query
+        rows = query.add_columns(page_total_column).order_by(*_MEMORY_ORDER).offset(
+            (page - 1) * page_size
+        ).limit(page_size + 1).all()
+        total = page_total(rows, page, query)
+        memories = [memory for memory, _ in rows]
+    has_more = len(memories) > page_size
+    memories = memories[:page_size]
     
     # Format response
     result = {
         "items": memories,
-        "total": total,
-        "page": page,
         "size": page_size,
-        "pages": ceil(total / page_size) if total > 0 else 1
+        "has_more": has_more,
+        "next_cursor": encode_created_cursor(
+            memories[-1].created_at, memories[-1].id, memories[-1].importance
+        ) if has_more else None
     }
+    if total is not None:
+        result.update({
+            "total": total,
+            "page": page,
+            "pages": ceil(total / page_size) if total > 0 else 1
+        })
     
     return result
 
 @router.get("/memory/{memory_id}")
-async def get_memory(memory_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_memory(memory_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get a memory by ID"""
     memory = db.query(UserMemory).filter(UserMemory.id == memory_id).first()
     if not memory:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memory not found")
     return memory
-
-@router.get("/types")
-async def get_memory_types(db: Session = Depends(get_db)):
-    """Get all unique memory types"""
-    # Query distinct memory types
-    memory_types = db.query(UserMemory.memory_type).distinct().filter(UserMemory.memory_type != None).all()
-    return [t[0] for t in memory_types if t[0]] 
\ No newline at end of file
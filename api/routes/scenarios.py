@@ -1,30 +1,82 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
+from sqlalchemy import desc, func, select
 from typing import List
+from collections import defaultdict
 import uuid
 
-from agir_db.db.session import get_db
+from api.database import get_db, stream_json_rows
+from api.middleware.etag import check_etag, etag_headers, make_etag
 from agir_db.models.scenario import Scenario
 from agir_db.models.episode import Episode
 from agir_db.models.state import State
 from agir_db.models.state_transition import StateTransition
 from agir_db.models.state_role import StateRole
+from agir_db.models.agent_role import AgentRole
 
 router = APIRouter()
 
 @router.get("/")
-async def get_scenarios(db: Session = Depends(get_db)):
+def get_scenarios(request: Request, db: Session = Depends(get_db)):
     """Get all scenarios"""
-    scenarios = db.query(Scenario).all()
-    return scenarios
+    # Revalidate from the latest update and the row count before loading every scenario
+    latest, count = db.query(func.max(Scenario.updated_at), func.count(Scenario.id)).one()
+    etag = make_etag(latest, count)
+    not_modified = check_etag(request, None, etag)
+    if not_modified:
+        return not_modified
+    
+    # Stream the rows from a server-side cursor instead of building the whole list first
+    return StreamingResponse(
+        stream_json_rows(select(Scenario.__table__)),
+        media_type="application/json",
+        headers=etag_headers(etag)
+    )
+
+def _change_markers(model, *criteria) -> tuple:
+    """
+    Correlated subqueries counting a scenario's child rows and finding their latest change
+    
+    Together they change whenever a row is added, removed or (where the model tracks
+    updated_at) edited, so they can stand in for the child rows in an ETag.
+    """
+    changed_at = getattr(model, "updated_at", None)
+    if changed_at is None:
+        changed_at = model.created_at
+    return (
+        select(func.count()).select_from(model).where(*criteria).correlate(Scenario).scalar_subquery(),
+        select(func.max(changed_at)).where(*criteria).correlate(Scenario).scalar_subquery(),
+    )
+
+# Ids of the states of the scenario being looked up, for the child rows keyed by state
+_scenario_state_ids = select(State.id).where(State.scenario_id == Scenario.id).correlate(Scenario)
+
+# Everything get_scenario's response is built from besides the scenario row: its episode
+# count, then change markers for its states, their transitions and roles, and the agent
+# roles those refer to
+_SCENARIO_DETAIL_VERSION = (
+    select(func.count(Episode.id)).where(Episode.scenario_id == Scenario.id).correlate(Scenario).scalar_subquery(),
+    *_change_markers(State, State.scenario_id == Scenario.id),
+    *_change_markers(StateTransition, StateTransition.from_state_id.in_(_scenario_state_ids)),
+    *_change_markers(StateRole, StateRole.state_id.in_(_scenario_state_ids)),
+    *_change_markers(AgentRole, AgentRole.scenario_id == Scenario.id),
+)
 
 @router.get("/{scenario_id}")
-async def get_scenario(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_scenario(scenario_id: uuid.UUID, request: Request, response: Response, db: Session = Depends(get_db)):
     """Get a scenario by ID with detailed information"""
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-    if not scenario:
+    # Count episodes and version the scenario's states, transitions and roles in the same
+    # query as the scenario lookup, so revalidation needs no further queries
+    row = db.query(Scenario, *_SCENARIO_DETAIL_VERSION).filter(Scenario.id == scenario_id).first()
+    if not row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scenario not found")
+    scenario, episodes_count, *child_versions = row
+    not_modified = check_etag(
+        request, response, make_etag(scenario.id, scenario.updated_at, episodes_count, *child_versions)
+    )
+    if not_modified:
+        return not_modified
     
     # Get states for this scenario
     states = db.query(State).filter(State.scenario_id == scenario_id).all()
@@ -50,12 +102,22 @@ async def get_scenario(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
             StateRole.state_id.in_(state_ids)
         ).all()
     
+    # Bucket transitions and roles by state once instead of scanning them for every state
+    transitions_from = defaultdict(list)
+    transitions_to = defaultdict(list)
+    for trans in transitions:
+        transitions_from[trans.from_state_id].append(trans)
+        transitions_to[trans.to_state_id].append(trans)
+    roles_by_state = defaultdict(list)
+    for role in state_roles:
+        roles_by_state[role.state_id].append(role)
+    
     # Format the response
     formatted_states = []
     for state in states:
-        state_transition_from = [t for t in transitions if t.from_state_id == state.id]
-        state_transition_to = [t for t in transitions if t.to_state_id == state.id]
-        state_role_list = [r for r in state_roles if r.state_id == state.id]
+        state_transition_from = transitions_from[state.id]
+        state_transition_to = transitions_to[state.id]
+        state_role_list = roles_by_state[state.id]
         
         formatted_states.append({
             "id": state.id,
@@ -87,9 +149,6 @@ async def get_scenario(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
             ]
         })
     
-    # Count episodes
-    episodes_count = db.query(Episode).filter(Episode.scenario_id == scenario_id).count()
-    
     # Construct the final response
     result = {
         "id": scenario.id,
@@ -104,12 +163,14 @@ async def get_scenario(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
     return result
 
 @router.get("/{scenario_id}/episodes")
-async def get_scenario_episodes(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_scenario_episodes(scenario_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get all episodes for a scenario"""
-    # First check if scenario exists
-    scenario = db.query(Scenario).filter(Scenario.id == scenario_id).first()
-    if not scenario:
+    # Outer join from the scenario, so one query both checks it exists and loads its episodes
+    rows = db.query(Scenario.id, Episode).outerjoin(
+        Episode, Episode.scenario_id == Scenario.id
+    ).filter(Scenario.id == scenario_id).order_by(desc(Episode.created_at)).all()
+    if not rows:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Scenario not found")
     
-    episodes = db.query(Episode).filter(Episode.scenario_id == scenario_id).order_by(desc(Episode.created_at)).all()
+    episodes = [episode for _, episode in rows if episode is not None]
     return episodes 
\ No newline at end of file
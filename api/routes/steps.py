@@ -1,33 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Dict, Any
+from sqlalchemy import desc, select, tuple_
+from typing import List, Dict, Any, Iterator, Optional
+import orjson
+import os
 import uuid
 
-from agir_db.db.session import get_db
+from api.cache import cache_page, get_cached_page
+from api.database import (
+    DB_STREAM_BATCH_SIZE, SessionLocal, decode_created_cursor, encode_created_cursor, get_db, model_to_dict, row_exists,
+    sender_name
+)
 from agir_db.models.step import Step
+from agir_db.models.user import User
 from agir_db.models.chat_conversation import ChatConversation
 from agir_db.models.chat_message import ChatMessage
 
 router = APIRouter()
 
+STEP_LIST_CACHE_TTL = int(os.environ.get("STEP_LIST_CACHE_TTL", 300))  # seconds
+
 @router.get("/")
-async def get_steps(db: Session = Depends(get_db)):
-    """Get all steps"""
-    steps = db.query(Step).all()
-    return steps
+def get_steps(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get steps, newest first
+    
+    Pass the previous response's next_cursor to get the following page.
+    """
+    # Steps are written by evolution runs outside the API, so cached pages expire by TTL only
+    cache_field = f"{limit}:{cursor or ''}"
+    cached = get_cached_page("steps", cache_field)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
+    # Keyset pagination: seek past the last (created_at, id) returned, fetching one
+    # extra row to tell whether another page follows
+    query = select(Step.__table__)
+    if cursor:
+        try:
+            query = query.where(tuple_(Step.created_at, Step.id) < decode_created_cursor(cursor))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    steps = db.execute(
+        query.order_by(desc(Step.created_at), desc(Step.id)).limit(limit + 1)
+    ).mappings().all()
+    has_more = len(steps) > limit
+    steps = steps[:limit]
+    
+    # Plain column rows, serialized by orjson without FastAPI's jsonable_encoder pass
+    payload = orjson.dumps({
+        "items": [dict(step) for step in steps],
+        "size": limit,
+        "has_more": has_more,
+        "next_cursor": encode_created_cursor(steps[-1]["created_at"], steps[-1]["id"]) if has_more else None
+    })
+    cache_page("steps", cache_field, payload, STEP_LIST_CACHE_TTL)
+    return Response(content=payload, media_type="application/json")
 
 @router.get("/{step_id}")
-async def get_step(step_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_step(step_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get a step by ID"""
     step = db.query(Step).options(
         joinedload(Step.state)
     ).filter(Step.id == step_id).first()
     if not step:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
-    return step
+    
+    # Same fields FastAPI's encoder took from the loaded step and state, without its pass
+    result = model_to_dict(step)
+    result["state"] = model_to_dict(step.state) if step.state else None
+    return ORJSONResponse(result)
 
 @router.get("/{step_id}/details")
-async def get_step_details(step_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_step_details(step_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get detailed information for a step"""
     step = db.query(Step).options(
         joinedload(Step.state)
@@ -54,13 +104,65 @@ async def get_step_details(step_id: uuid.UUID, db: Session = Depends(get_db)):
         "state": state_data
     }
     
-    return response
+    return ORJSONResponse(response)
+
+def _stream_conversations(conversations: Dict[uuid.UUID, Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Yield conversations with their messages as one JSON array, reading messages in batches
+    
+    Messages come from a single server-side cursor ordered by conversation, so each
+    conversation's messages are written as they arrive; conversations without messages
+    follow at the end. The query runs on its own session, since the request's session is
+    closed before a streaming body is sent.
+    
+    Args:
+        conversations: Formatted conversations without messages, by ID
+    """
+    db = SessionLocal()
+    try:
+        messages = db.execute(
+            select(
+                ChatMessage.conversation_id,
+                ChatMessage.id,
+                ChatMessage.content,
+                ChatMessage.sender_id,
+                sender_name,
+                ChatMessage.created_at
+            ).outerjoin(
+                User, User.id == ChatMessage.sender_id
+            ).where(
+                ChatMessage.conversation_id.in_(list(conversations))
+            ).order_by(
+                ChatMessage.conversation_id, ChatMessage.created_at
+            ).execution_options(yield_per=DB_STREAM_BATCH_SIZE)
+        ).mappings()
+        
+        yield b"["
+        remaining = dict(conversations)
+        current = None
+        for msg in messages:
+            msg = dict(msg)
+            conversation_id = msg.pop("conversation_id")
+            if conversation_id != current:
+                # Close the previous conversation and open this one
+                if current is not None:
+                    yield b"]},"
+                current = conversation_id
+                yield orjson.dumps(remaining.pop(conversation_id))[:-1] + b',"messages":['
+                separator = b""
+            yield separator + orjson.dumps(msg)
+            separator = b","
+        if current is not None:
+            yield b"]}" + (b"," if remaining else b"")
+        yield b",".join(orjson.dumps({**conv, "messages": []}) for conv in remaining.values())
+        yield b"]"
+    finally:
+        db.close()
 
 @router.get("/{step_id}/conversations")
-async def get_step_conversations(step_id: uuid.UUID, db: Session = Depends(get_db)):
+def get_step_conversations(step_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get conversations related to a step"""
-    step = db.query(Step).filter(Step.id == step_id).first()
-    if not step:
+    if not row_exists(db, Step, step_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Step not found")
     
     # Get conversations related to this step
@@ -68,39 +170,16 @@ async def get_step_conversations(step_id: uuid.UUID, db: Session = Depends(get_d
         ChatConversation.related_id == step_id,
         ChatConversation.related_type == 'step'
     ).all()
+    if not conversations:
+        return ORJSONResponse([])
     
-    result = []
-    for conv in conversations:
-        # Get messages for this conversation sorted by created_at
-        messages = db.query(ChatMessage).options(
-            joinedload(ChatMessage.sender)
-        ).filter(
-            ChatMessage.conversation_id == conv.id
-        ).order_by(ChatMessage.created_at).all()
-        
-        # Format messages for this conversation
-        formatted_messages = []
-        for msg in messages:
-            sender_name = "Unknown"
-            if msg.sender:
-                if msg.sender.first_name and msg.sender.last_name:
-                    sender_name = f"{msg.sender.first_name} {msg.sender.last_name}"
-                else:
-                    sender_name = msg.sender.username
-            
-            formatted_messages.append({
-                "id": msg.id,
-                "content": msg.content,
-                "sender_id": msg.sender_id,
-                "sender_name": sender_name,
-                "created_at": msg.created_at
-            })
-        
-        result.append({
+    formatted = {
+        conv.id: {
             "id": conv.id,
             "name": conv.title if hasattr(conv, 'title') and conv.title else f"Conversation {conv.id}",
-            "created_at": conv.created_at,
-            "messages": formatted_messages
-        })
+            "created_at": conv.created_at
+        } for conv in conversations
+    }
     
-    return result 
\ No newline at end of file
+    # Stream the messages instead of holding every conversation's messages in memory
+    return StreamingResponse(_stream_conversations(formatted), media_type="application/json")
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, literal, text, tuple_
 from typing import List, Dict, Any, Optional
+import orjson
+import os
 import uuid
 from math import ceil
 
-from agir_db.db.session import get_db
+from api.cache import cache_page, get_cached_page
+from api.database import (
+    SessionLocal, decode_created_cursor, encode_created_cursor, get_db, page_total, page_total_column, row_exists
+)
 from agir_db.models.user import User
 from agir_db.models.agent_assignment import AgentAssignment
 from agir_db.models.agent_role import AgentRole
@@ -15,66 +21,128 @@ from api.middleware.auth import get_current_user
 
 router = APIRouter()
 
+USER_LIST_CACHE_TTL = int(os.environ.get("USER_LIST_CACHE_TTL", 60))  # seconds
+
+# Searchable user fields as one expression, so a single trigram index can serve the
+# unanchored ILIKE instead of four separate scans. It is built from || and coalesce
+# (not concat_ws, which isn't immutable) to match USER_SEARCH_INDEX_DDL; the schema
+# belongs to agir_db, so the API only warns at startup when the index is missing
+_user_search_text = (
+    func.coalesce(User.username, "") + " " + func.coalesce(User.email, "") + " " +
+    func.coalesce(User.first_name, "") + " " + func.coalesce(User.last_name, "")
+)
+USER_SEARCH_INDEX_DDL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX CONCURRENTLY ix_users_search_trgm ON users USING gin ((
+    coalesce(username, '') || ' ' || coalesce(email, '') || ' ' ||
+    coalesce(first_name, '') || ' ' || coalesce(last_name, '')
+) gin_trgm_ops);
+"""
+
+def user_search_index_exists() -> bool:
+    """Check whether the users table has a trigram index, without which searches scan every row"""
+    db = SessionLocal()
+    try:
+        return db.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_indexes "
+            "WHERE tablename = 'users' AND indexdef LIKE '%gin_trgm_ops%')"
+        )).scalar()
+    finally:
+        db.close()
+
+# Fields listed for each user, selected as columns so no User objects are built;
+# profile fields missing from the model are listed as null
+_USER_LIST_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.first_name,
+    User.last_name,
+    # Both names or nothing: || yields NULL if either side is NULL
+    func.coalesce(func.nullif(User.first_name, "") + " " + func.nullif(User.last_name, ""), "").label("full_name"),
+    User.created_at,
+    *(getattr(User, attr, literal(None)).label(attr) for attr in ("avatar", "profession", "description"))
+)
+
 @router.get("/")
-async def get_users(
+def get_users(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all users with pagination and optional search"""
+    """
+    Get all users with pagination and optional search
+    
+    Pages are numbered by default. Passing the previous response's next_cursor
+    instead seeks straight to the next page and skips the total count.
+    """
+    # The list is the same for every caller, so serve repeated pages from Redis
+    cache_field = f"{page}:{page_size}:{search or ''}:{cursor or ''}"
+    cached = get_cached_page("users", cache_field)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+    
     # Build query
     query = db.query(User)
     
     # Apply search filter if provided
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            User.username.ilike(search_term) |
-            User.email.ilike(search_term) |
-            User.first_name.ilike(search_term) |
-            User.last_name.ilike(search_term)
-        )
-    
-    # Get total count for pagination
-    total = query.count()
+        query = query.filter(_user_search_text.ilike(f"%{search}%"))
     
-    # Add pagination
-    query = query.order_by(desc(User.created_at))
-    query = query.offset((page - 1) * page_size).limit(page_size)
+    # Newest first, with the id as a tiebreaker; one extra row tells whether another page follows
+    order = (desc(User.created_at), desc(User.id))
+    total = None
+    if cursor:
+        try:
+            query = query.filter(tuple_(User.created_at, User.id) < decode_created_cursor(cursor))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        users = query.with_entities(*_USER_LIST_COLUMNS).order_by(*order).limit(page_size + 1).all()
+    else:
+        # Get the page, with the total count for pagination in the same query
+        users = query.with_entities(*_USER_LIST_COLUMNS, page_total_column).order_by(*order).offset(
+            (page - 1) * page_size
+        ).limit(page_size + 1).all()
+        total = page_total(users, page, query)
+    has_more = len(users) > page_size
+    users = users[:page_size]
     
-    # Execute query
-    users = query.all()
-    
-    # Format response to include full name
-    result_items = []
-    for user in users:
-        full_name = f"{user.first_name} {user.last_name}" if user.first_name and user.last_name else ""
-        user_data = {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "full_name": full_name,
-            "created_at": user.created_at,
-            "avatar": getattr(user, "avatar", None),
-            "profession": getattr(user, "profession", None),
-            "description": getattr(user, "description", None)
-        }
-        result_items.append(user_data)
+    # Rows already hold the listed fields, so only the page total needs dropping
+    result_items = [user._asdict() for user in users]
+    if total is not None:
+        for user_data in result_items:
+            del user_data["total"]
     
     # Return paginated response
-    return {
+    result = {
         "items": result_items,
-        "total": total,
-        "page": page,
         "size": page_size,
-        "pages": ceil(total / page_size) if total > 0 else 1
+        "has_more": has_more,
+        "next_cursor": encode_created_cursor(users[-1].created_at, users[-1].id) if has_more else None
     }
+    if total is not None:
+        result.update({
+            "total": total,
+            "page": page,
+            "pages": ceil(total / page_size) if total > 0 else 1
+        })
+    payload = orjson.dumps(result)
+    cache_page("users", cache_field, payload, USER_LIST_CACHE_TTL)
+    return Response(content=payload, media_type="application/json")
+
+# Optional profile attributes, filtered once to those the User model actually has
+_USER_EXTRA_ATTRS = tuple(
+    attr for attr in ("avatar", "description", "interests", "skills") if hasattr(User, attr)
+)
+_USER_PROFILE_ATTRS = tuple(
+    attr for attr in ("avatar", "description", "birth_date", "gender", "profession",
+                      "personality_traits", "background", "interests", "skills") if hasattr(User, attr)
+)
 
 @router.get("/{user_id}")
-async def get_user(
+def get_user(
     user_id: uuid.UUID, 
     db: Session = Depends(get_db)
 ):
@@ -97,14 +165,15 @@ async def get_user(
     }
     
     # Add any additional profile data if available
-    for attr in ["avatar", "description", "interests", "skills"]:
-        if hasattr(user, attr) and getattr(user, attr):
-            result[attr] = getattr(user, attr)
+    for attr in _USER_EXTRA_ATTRS:
+        value = getattr(user, attr)
+        if value:
+            result[attr] = value
     
-    return result
+    return ORJSONResponse(result)
 
 @router.get("/{user_id}/profile")
-async def get_user_profile(
+def get_user_profile(
     user_id: uuid.UUID, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -127,92 +196,86 @@ async def get_user_profile(
     }
     
     # Add additional profile attributes if they exist
-    for attr in ["avatar", "description", "birth_date", "gender", "profession", 
-                "personality_traits", "background", "interests", "skills"]:
-        if hasattr(user, attr) and getattr(user, attr):
-            profile[attr] = getattr(user, attr)
+    for attr in _USER_PROFILE_ATTRS:
+        value = getattr(user, attr)
+        if value:
+            profile[attr] = value
     
-    return profile
+    return ORJSONResponse(profile)
+
+# Episode fields listed by the user episode endpoints
+_EPISODE_COLUMNS = (Episode.id, Episode.scenario_id, Episode.status, Episode.created_at, Episode.updated_at)
+
+def _format_episode(row: Any, **extra: Any) -> Dict[str, Any]:
+    """Format an episode row selected with _EPISODE_COLUMNS, scenario_name and the page total"""
+    episode = row._asdict()
+    del episode["total"]
+    episode_status = episode["status"]
+    episode["status"] = episode_status.value if hasattr(episode_status, 'value') else str(episode_status)
+    episode.update(extra)
+    return episode
 
 @router.get("/{user_id}/episodes")
-async def get_user_episodes(
+def get_user_episodes(
     user_id: uuid.UUID,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """Get episodes that this user has participated in via agent assignments"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if not row_exists(db, User, user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
-    # Get agent assignments for this user with pagination
-    assignments_query = db.query(AgentAssignment).filter(
+    # Get agent assignments for this user whose episode still exists
+    assignments_query = db.query(AgentAssignment).join(
+        Episode, Episode.id == AgentAssignment.episode_id
+    ).filter(
         AgentAssignment.user_id == user_id
     )
     
-    # Get total count for pagination
-    total = assignments_query.count()
-    
-    # Apply pagination
-    assignments = assignments_query.order_by(desc(AgentAssignment.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    # Apply pagination, joining each assignment's role and scenario and counting
+    # the total for pagination in the same query
+    rows = assignments_query.outerjoin(
+        AgentRole, AgentRole.id == AgentAssignment.role_id
+    ).outerjoin(
+        Scenario, Scenario.id == Episode.scenario_id
+    ).with_entities(
+        *_EPISODE_COLUMNS,
+        Scenario.name.label("scenario_name"),
+        func.coalesce(func.nullif(AgentAssignment.description, ""), AgentRole.description).label("role_description"),
+        page_total_column
+    ).order_by(desc(AgentAssignment.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    total = page_total(rows, page, assignments_query)
     
-    if not assignments:
-        return {
+    if not rows:
+        return ORJSONResponse({
             "items": [],
             "total": total,
             "page": page,
             "size": page_size,
             "pages": ceil(total / page_size) if total > 0 else 1
-        }
+        })
     
-    # Get episodes and related info
-    result = []
-    for assignment in assignments:
-        # Get episode
-        episode = db.query(Episode).filter(Episode.id == assignment.episode_id).first()
-        if not episode:
-            continue
-            
-        # Get role
-        role = db.query(AgentRole).filter(AgentRole.id == assignment.role_id).first()
-        
-        # Get scenario
-        scenario = db.query(Scenario).filter(Scenario.id == episode.scenario_id).first()
-        
-        episode_data = {
-            "id": episode.id,
-            "scenario_id": episode.scenario_id,
-            "status": episode.status.value if hasattr(episode.status, 'value') else str(episode.status),
-            "created_at": episode.created_at,
-            "updated_at": episode.updated_at,
-            "scenario_name": scenario.name if scenario else None,
-            "role_description": assignment.description if assignment.description else (role.description if role else None)
-        }
-        
-        result.append(episode_data)
+    # Rows arrive newest first from the query
+    result = [_format_episode(row) for row in rows]
     
-    # Sort by creation date, newest first
-    result.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    return {
+    return ORJSONResponse({
         "items": result,
         "total": total,
         "page": page,
         "size": page_size,
         "pages": ceil(total / page_size) if total > 0 else 1
-    }
+    })
 
 @router.get("/{user_id}/learning")
-async def get_user_learning_episodes(
+def get_user_learning_episodes(
     user_id: uuid.UUID,
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
     """Get episodes that this user initiated (learning episodes)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if not row_exists(db, User, user_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     
     # Get episodes initiated by this user with pagination
@@ -220,57 +283,49 @@ async def get_user_learning_episodes(
         Episode.initiator_id == user_id
     )
     
-    # Get total count for pagination
-    total = episodes_query.count()
-    
-    # Apply pagination
-    episodes = episodes_query.order_by(desc(Episode.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    # Apply pagination, joining each episode's scenario and counting the total
+    # for pagination in the same query
+    episodes = episodes_query.outerjoin(
+        Scenario, Scenario.id == Episode.scenario_id
+    ).with_entities(
+        *_EPISODE_COLUMNS,
+        Scenario.name.label("scenario_name"),
+        page_total_column
+    ).order_by(desc(Episode.created_at)).offset((page - 1) * page_size).limit(page_size).all()
+    total = page_total(episodes, page, episodes_query)
     
     if not episodes:
-        return {
+        return ORJSONResponse({
             "items": [],
             "total": total,
             "page": page,
             "size": page_size,
             "pages": ceil(total / page_size) if total > 0 else 1
-        }
+        })
     
-    # Get related info for each episode
-    result = []
-    for episode in episodes:
-        # Get scenario
-        scenario = db.query(Scenario).filter(Scenario.id == episode.scenario_id).first()
-        
-        # Get user's role in this episode (if any)
-        assignment = db.query(AgentAssignment).filter(
-            AgentAssignment.episode_id == episode.id,
-            AgentAssignment.user_id == user_id
-        ).first()
-        
-        role_description = None
-        if assignment:
-            role = db.query(AgentRole).filter(AgentRole.id == assignment.role_id).first()
-            role_description = assignment.description if assignment.description else (role.description if role else None)
-        
-        episode_data = {
-            "id": episode.id,
-            "scenario_id": episode.scenario_id,
-            "status": episode.status.value if hasattr(episode.status, 'value') else str(episode.status),
-            "created_at": episode.created_at,
-            "updated_at": episode.updated_at,
-            "scenario_name": scenario.name if scenario else None,
-            "role_description": role_description
-        }
-        
-        result.append(episode_data)
+    # Get the user's role in each of these episodes (if any) with one query for the page
+    role_descriptions = {}
+    assignments = db.query(
+        AgentAssignment.episode_id,
+        func.coalesce(func.nullif(AgentAssignment.description, ""), AgentRole.description)
+    ).outerjoin(
+        AgentRole, AgentRole.id == AgentAssignment.role_id
+    ).filter(
+        AgentAssignment.episode_id.in_([episode.id for episode in episodes]),
+        AgentAssignment.user_id == user_id
+    ).all()
+    for episode_id, role_description in assignments:
+        role_descriptions.setdefault(episode_id, role_description)
     
-    # Sort by creation date, newest first
-    result.sort(key=lambda x: x["created_at"], reverse=True)
+    result = [
+        _format_episode(episode, role_description=role_descriptions.get(episode.id))
+        for episode in episodes
+    ]
     
-    return {
+    return ORJSONResponse({
         "items": result,
         "total": total,
         "page": page,
         "size": page_size,
         "pages": ceil(total / page_size) if total > 0 else 1
-    } 
\ No newline at end of file
+    }) 
\ No newline at end of file
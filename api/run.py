@@ -6,24 +6,43 @@ Run the AGIR API server
 import uvicorn
 import os
 import sys
+import atexit
 import logging
+import queue
 import argparse
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 def setup_logging(log_level: str = "INFO"):
-    """Setup logging configuration"""
+    """
+    Setup logging configuration
+    
+    Safe to call more than once per process: the API's startup hook also calls it,
+    since uvicorn's worker processes never run this script's __main__ block.
+    """
+    root_logger = logging.getLogger()
+    if any(isinstance(handler, QueueHandler) for handler in root_logger.handlers):
+        return
+    
     # Convert string level to logging constant
     numeric_level = getattr(logging, log_level.upper(), logging.INFO)
     
-    # Configure logging format
-    logging.basicConfig(
-        level=numeric_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    # Format and write records on a background thread, so logging threads only enqueue them
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    ))
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    root_logger.setLevel(numeric_level)
+    root_logger.addHandler(QueueHandler(log_queue))
     
     # Set specific loggers levels
     logging.getLogger("uvicorn").setLevel(logging.INFO)
@@ -51,11 +70,18 @@ def parse_args():
         default=os.environ.get("API_HOST", "0.0.0.0"),
         help="Host to bind the server to (default: 0.0.0.0, can also be set via API_HOST env var)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("API_WORKERS", 1)),
+        help="Number of worker processes (default: 1, can also be set via API_WORKERS env var; ignored with --reload). "
+             "Each worker opens its own database pools, so size this against the server's max_connections"
+    )
     parser.add_argument(
         "--reload",
         action="store_true",
-        default=os.environ.get("API_RELOAD", "true").lower() in ["true", "1", "yes"],
-        help="Enable auto-reload for development (default: true, can be set via API_RELOAD env var)"
+        default=os.environ.get("API_RELOAD", "false").lower() in ["true", "1", "yes"],
+        help="Enable auto-reload for development (default: false, can be set via API_RELOAD env var)"
     )
     return parser.parse_args()
 
@@ -63,7 +89,8 @@ if __name__ == "__main__":
     # Parse command line arguments
     args = parse_args()
     
-    # Setup logging
+    # Setup logging; worker processes read the level from the environment
+    os.environ["LOG_LEVEL"] = args.log_level
     setup_logging(args.log_level)
     
     # Log startup information
@@ -72,6 +99,7 @@ if __name__ == "__main__":
     logger.info(f"Host: {args.host}")
     logger.info(f"Port: {args.port}")
     logger.info(f"Reload: {args.reload}")
+    logger.info(f"Workers: {1 if args.reload else args.workers}")
     logger.info(f"Log Level: {args.log_level}")
     
     print(f"Starting AGIR API server on {args.host}:{args.port}...")
@@ -83,5 +111,9 @@ if __name__ == "__main__":
         host=args.host, 
         port=args.port, 
         reload=args.reload,
+        workers=None if args.reload else args.workers,
+        # uvloop and httptools when installed (uvicorn[standard]), otherwise asyncio and h11
+        loop="auto",
+        http="auto",
         log_level=args.log_level.lower()
     ) 
\ No newline at end of file
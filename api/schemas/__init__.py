@@ -0,0 +1,3 @@
+"""
+Request schemas shared by the API routes
+"""
\ No newline at end of file
@@ -0,0 +1,14 @@
+import os
+from pydantic import BaseModel, ConfigDict
+
+# Request size bounds, checked by the validator before any handler work
+MAX_CONTENT_LENGTH = int(os.environ.get("MAX_CONTENT_LENGTH", 32768))  # characters per string field
+MAX_CHAT_MESSAGES = 256
+
+REQUEST_CONFIG = ConfigDict(extra="ignore", frozen=True, str_max_length=MAX_CONTENT_LENGTH)
+
+class ChatMessage(BaseModel):
+    model_config = REQUEST_CONFIG
+    
+    role: str  # "user", "assistant", "system"
+    content: str
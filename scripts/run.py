@@ -5,18 +5,9 @@ import os
 import sys
 import argparse
 import logging
-from dotenv import load_dotenv
 
-load_dotenv()
-
-from src.common.utils.check_database_tables import check_database_tables
-from src.construction.run_construction import run_construction
-from src.evolution.run_evolution import run_evolution
-from src.common.utils.log_config import configure_logging
-from src.common.utils.yaml_validator import validate_yaml_file
-
-# Replace the basic logging setup with our Rich-based colorized logging
-configure_logging(level=logging.INFO)
+# Heavy imports (database models, LLM SDKs, pydantic validators) are deferred
+# to main() so that `--help` and argument errors return immediately.
 logger = logging.getLogger(__name__)
 
 def parse_args():
@@ -110,6 +101,11 @@ def main():
     """Main entry point for the CLI."""
     args = parse_args()
     
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    from src.common.utils.log_config import configure_logging
+    
     # Configure logging based on arguments
     log_level = logging.DEBUG if args.verbose else logging.INFO
     log_file = args.log_file if hasattr(args, 'log_file') and args.log_file else None
@@ -122,6 +118,7 @@ def main():
     )
     
     if not args.skip_db_check:
+        from src.common.utils.check_database_tables import check_database_tables
         logger.info("Checking database tables...")
         if not check_database_tables():
             logger.error("Database tables check failed. Please ensure database migrations have been run.")
@@ -139,6 +136,7 @@ def main():
         
         # Validate YAML structure unless skip flag is set
         if not args.skip_yaml_validation:
+            from src.common.utils.yaml_validator import validate_yaml_file
             logger.info(f"Validating scenario YAML structure: {args.scenario_file}")
             if not validate_yaml_file(args.scenario_file):
                 logger.error(f"YAML validation failed for file: {args.scenario_file}")
@@ -146,6 +144,7 @@ def main():
             logger.info("YAML validation successful")
             
         # Create scenario from YAML file
+        from src.construction.run_construction import run_construction
         logger.info(f"Creating scenario from file: {args.scenario_file}")
         scenario_id = run_construction(args.scenario_file)
         
@@ -168,6 +167,8 @@ def main():
         logger.info("Setup-only flag set or init mode selected, exiting without executing scenario")
         sys.exit(0)
     
+    from src.evolution.run_evolution import run_evolution
+    
     try:        
         # Run evolution scenario, now using the ID rather than loading from file again
         logger.info(f"Running evolution scenario with ID: {scenario_id}, episodes: {args.episodes}")
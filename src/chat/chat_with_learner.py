@@ -3,11 +3,18 @@ Chat with learner module - allows direct conversation with a learner user.
 This module uses the learner's memories to provide context-aware responses.
 """
 
+import copy
 import logging
+import os
+import threading
+import time
 import uuid
 import sys
+from collections import OrderedDict
+from types import SimpleNamespace
 from typing import List, Dict, Any, Optional, Tuple
 
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 import json
 import argparse
@@ -16,7 +23,7 @@ from agir_db.db.session import get_db
 from agir_db.models.user import User
 from agir_db.models.memory import UserMemory
 from src.common.utils.memory_utils import get_user_memories, search_user_memories, add_user_memory
-from src.completions.fast_memory_retriever import get_fast_memory_retriever
+from src.completions.fast_memory_retriever import RETRIEVER_CACHE_LIMIT, FastMemoryRetriever, get_fast_memory_retriever
 from src.llm.llm_provider import get_llm_model
 
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
@@ -28,7 +35,7 @@ class LearnerChatSession:
     Class to manage a chat session with a learner.
     """
     
-    def __init__(self, username: str = None, user_id: str = None, temperature: float = 0.7, max_tokens: Optional[int] = None):
+    def __init__(self, username: str = None, user_id: str = None, temperature: float = 0.7, max_tokens: Optional[int] = None, model: Optional[str] = None):
         """
         Initialize a chat session with a learner.
         
@@ -37,6 +44,7 @@ class LearnerChatSession:
             user_id: User ID of the learner to chat with (alternative to username)
             temperature: Sampling temperature for the LLM (0.0 to 2.0)
             max_tokens: Maximum tokens to generate
+            model: Optional model name to override the learner's default model
         """
         if not username and not user_id:
             raise ValueError("Either username or user_id must be provided")
@@ -47,21 +55,31 @@ class LearnerChatSession:
         if not self.user:
             raise ValueError(f"User with {'username ' + username if username else 'ID ' + user_id} not found")
         
-        if not self.user.llm_model:
+        if not model and not self.user.llm_model:
             raise ValueError(f"User {self.user.username} has no LLM model specified")
         
-        self.model_name = self.user.llm_model
+        self.model_name = model or self.user.llm_model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.llm = get_llm_model(self.model_name, temperature=temperature, max_tokens=max_tokens)
         self.chat_history = []
         
-        # Use cached FastMemoryRetriever instead of loading memories directly
-        self.memory_retriever = get_fast_memory_retriever(str(self.user.id))
+        # Use cached FastMemoryRetriever instead of loading memories directly; it is
+        # looked up on each use (see memory_retriever) rather than held by the session
         
         logger.info(f"Initialized chat session with learner {self.user.username} using model {self.model_name}, temperature={temperature}, max_tokens={max_tokens}")
         logger.info(f"Loaded {self.memory_retriever.get_memory_count()} memories using cached retriever")
     
+    @property
+    def memory_retriever(self) -> FastMemoryRetriever:
+        """
+        The learner's memory retriever, from the bounded retriever cache.
+        
+        Not holding it keeps cached sessions from pinning FAISS indexes the
+        retriever cache has already evicted.
+        """
+        return get_fast_memory_retriever(str(self.user.id))
+    
     def _find_user(self, username: str = None, user_id: str = None) -> Optional[User]:
         """
         Find a user by username or ID.
@@ -286,7 +304,7 @@ You should respond based on your profile, memories and learned knowledge.
             logger.info(f"Closed chat session with learner {self.user.username}")
 
 
-def create_chat_session(username: str = None, user_id: str = None, temperature: float = 0.7, max_tokens: Optional[int] = None) -> Optional[LearnerChatSession]:
+def create_chat_session(username: str = None, user_id: str = None, temperature: float = 0.7, max_tokens: Optional[int] = None, model: Optional[str] = None) -> Optional[LearnerChatSession]:
     """
     Create a chat session with a learner.
     
@@ -295,12 +313,85 @@ def create_chat_session(username: str = None, user_id: str = None, temperature:
         user_id: User ID of the learner to chat with (alternative to username)
         temperature: Sampling temperature for the LLM (0.0 to 2.0)
         max_tokens: Maximum tokens to generate
+        model: Optional model name to override the learner's default model
         
     Returns:
         Optional[LearnerChatSession]: Chat session if created successfully, None otherwise
     """
     try:
-        return LearnerChatSession(username=username, user_id=user_id, temperature=temperature, max_tokens=max_tokens)
+        return LearnerChatSession(username=username, user_id=user_id, temperature=temperature, max_tokens=max_tokens, model=model)
     except Exception as e:
         logger.error(f"Failed to create chat session: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+# Sessions built once per learner and settings; callers get shallow copies that
+# share the LLM client and user snapshot but have their own chat state.
+# Entries expire so changes to the learner's profile or model are picked up.
+# Sessions fetch their memory retriever from its cache on use, so memory is bounded by
+# RETRIEVER_CACHE_LIMIT FAISS indexes there plus this many LLM clients and user snapshots
+CHAT_SESSION_CACHE_TTL = int(os.environ.get("CHAT_SESSION_CACHE_TTL", 300))  # seconds
+_session_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_session_cache_limit = RETRIEVER_CACHE_LIMIT
+_session_cache_lock = threading.Lock()
+
+def _snapshot_user(user: User) -> SimpleNamespace:
+    """Plain copy of a user's column values, safe to read after its database session closes"""
+    return SimpleNamespace(**{attr.key: getattr(user, attr.key) for attr in inspect(user).mapper.column_attrs})
+
+def get_chat_session(user_id: str, temperature: float = 0.7, max_tokens: Optional[int] = None, model: Optional[str] = None) -> Optional[LearnerChatSession]:
+    """
+    Get a chat session with a learner, reusing the setup of earlier sessions with the same settings.
+    
+    The session starts with an empty chat history. Its database session is already
+    closed and its user is a plain snapshot of the learner's columns, so callers
+    don't need to close it.
+    
+    Args:
+        user_id: User ID of the learner to chat with
+        temperature: Sampling temperature for the LLM (0.0 to 2.0)
+        max_tokens: Maximum tokens to generate
+        model: Optional model name to override the learner's default model
+        
+    Returns:
+        Optional[LearnerChatSession]: Chat session if created successfully, None otherwise
+    """
+    cache_key = (user_id, temperature, max_tokens, model)
+    session = None
+    with _session_cache_lock:
+        entry = _session_cache.get(cache_key)
+        if entry is not None:
+            expires_at, session = entry
+            if expires_at <= time.time():
+                del _session_cache[cache_key]
+                session = None
+            else:
+                _session_cache.move_to_end(cache_key)
+    
+    if session is None:
+        session = create_chat_session(user_id=user_id, temperature=temperature, max_tokens=max_tokens, model=model)
+        if session is None:
+            return None
+        # The database session is only needed to look up the user, so keep plain
+        # values rather than an ORM object that is detached once it closes
+        session.user = _snapshot_user(session.user)
+        session.close()
+        
+        if CHAT_SESSION_CACHE_TTL > 0:
+            with _session_cache_lock:
+                _session_cache[cache_key] = (time.time() + CHAT_SESSION_CACHE_TTL, session)
+                while len(_session_cache) > _session_cache_limit:
+                    _session_cache.popitem(last=False)
+    
+    chat_session = copy.copy(session)
+    chat_session.chat_history = []
+    return chat_session
+
+def get_chat_session_cache_size() -> int:
+    """Get the number of cached chat sessions"""
+    return len(_session_cache)
+
+def clear_chat_session_cache():
+    """Clear cached chat sessions"""
+    with _session_cache_lock:
+        _session_cache.clear()
+    logger.info("Chat session cache cleared")
@@ -2,51 +2,153 @@
 Agent model
 """
 
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
-import uuid
+from dataclasses import dataclass, field, fields
+import io
+from typing import Dict, Any, Iterator, List, Optional
+import os
+import threading
 
+# Number of recent memories included in the agent's system prompt
+RECENT_MEMORY_LIMIT = 5
 
-class Agent(BaseModel):
+# Separator between sections of the system prompt
+PROMPT_SEPARATOR = "\n\n"
+
+# Number of agent IDs generated per os.urandom call
+ID_POOL_BATCH_SIZE = 256
+
+
+def _id_pool(batch_size: int = ID_POOL_BATCH_SIZE) -> Iterator[str]:
+    """
+    Yield random UUID4-formatted IDs, reading entropy for a whole batch at once.
+    
+    Args:
+        batch_size: Number of IDs generated per os.urandom call
+        
+    Yields:
+        UUID4 strings in the canonical 8-4-4-4-12 format
+    """
+    while True:
+        buf = bytearray(os.urandom(16 * batch_size))
+        for offset in range(0, len(buf), 16):
+            buf[offset + 6] = (buf[offset + 6] & 0x0F) | 0x40  # version 4
+            buf[offset + 8] = (buf[offset + 8] & 0x3F) | 0x80  # RFC 4122 variant
+            h = buf[offset:offset + 16].hex()
+            yield f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+_ids = _id_pool()
+_ids_lock = threading.Lock()
+
+
+def _reset_id_pool() -> None:
+    """Start a fresh pool in a forked child, so it doesn't reuse the parent's buffered IDs"""
+    global _ids, _ids_lock
+    _ids = _id_pool()
+    _ids_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_id_pool)
+
+
+def _next_agent_id() -> str:
+    """Take the next ID from the shared pool"""
+    with _ids_lock:
+        return next(_ids)
+
+
+@dataclass(slots=True, kw_only=True)
+class Agent:
     """
     Represents an LLM-powered agent in the system.
     """
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_next_agent_id)
     name: str
     role: str
     description: Optional[str] = None
-    skills: List[str] = Field(default_factory=list)
-    knowledge_base: Dict[str, Any] = Field(default_factory=dict)
-    memory: List[Dict[str, Any]] = Field(default_factory=list)
+    skills: List[str] = field(default_factory=list)
+    knowledge_base: Dict[str, Any] = field(default_factory=dict)
+    memory: List[Dict[str, Any]] = field(default_factory=list)
     system_prompt: Optional[str] = None
     
-    def build_system_prompt(self) -> str:
+    # Cached identity/skills part of the system prompt, keyed by the fields it depends on
+    _static_prompt_cache: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _static_prompt_sig: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Agent":
         """
-        Build a system prompt for the agent based on its role, description, skills, etc.
+        Create an agent from a dictionary, e.g. loaded from YAML.
         
+        Args:
+            data: Agent data; unknown keys are ignored
+            
         Returns:
-            A formatted system prompt string
+            A new Agent instance
+            
+        Raises:
+            ValueError: If a required field is missing or has the wrong type
+        """
+        for required in ("name", "role"):
+            if not isinstance(data.get(required), str):
+                raise ValueError(f"Agent field '{required}' must be a string")
+        
+        init_fields = {f.name for f in fields(cls) if f.init}
+        return cls(**{key: value for key, value in data.items() if key in init_fields})
+    
+    def _build_static_prompt(self) -> str:
         """
-        prompt_parts = []
+        Build the part of the system prompt that does not depend on memory.
         
-        prompt_parts.append(f"You are {self.name}, a {self.role}.")
+        The result is cached and only rebuilt when name, role, description,
+        skills or system_prompt change.
         
-        if self.description:
-            prompt_parts.append(self.description)
+        Returns:
+            The static system prompt prefix
+        """
+        sig = (self.name, self.role, self.description, tuple(self.skills), self.system_prompt)
+        if sig != self._static_prompt_sig:
+            buf = io.StringIO()
+            buf.write(f"You are {self.name}, a {self.role}.")
             
-        if self.skills:
-            skills_str = ", ".join(self.skills)
-            prompt_parts.append(f"Your skills include: {skills_str}.")
+            if self.description:
+                buf.write(PROMPT_SEPARATOR)
+                buf.write(self.description)
+                
+            if self.skills:
+                buf.write(PROMPT_SEPARATOR)
+                buf.write(f"Your skills include: {', '.join(self.skills)}.")
+                
+            if self.system_prompt:
+                buf.write(PROMPT_SEPARATOR)
+                buf.write(self.system_prompt)
             
-        if self.system_prompt:
-            prompt_parts.append(self.system_prompt)
+            self._static_prompt_cache = buf.getvalue()
+            self._static_prompt_sig = sig
             
-        if self.memory:
-            prompt_parts.append("Relevant past experiences:")
-            for i, memory in enumerate(self.memory[-5:], 1):  # Include last 5 memories
-                prompt_parts.append(f"{i}. {memory['content']}")
-                
-        return "\n\n".join(prompt_parts)
+        return self._static_prompt_cache
+    
+    def build_system_prompt(self) -> str:
+        """
+        Build a system prompt for the agent based on its role, description, skills, etc.
+        
+        Returns:
+            A formatted system prompt string
+        """
+        # Sliced from memory on each build, so it stays correct however memory is changed
+        recent_memory = self.memory[-RECENT_MEMORY_LIMIT:]
+        if not recent_memory:
+            return self._build_static_prompt()
+        
+        buf = io.StringIO()
+        buf.write(self._build_static_prompt())
+        buf.write(PROMPT_SEPARATOR)
+        buf.write("Relevant past experiences:")
+        for i, memory in enumerate(recent_memory, 1):
+            buf.write(f"{PROMPT_SEPARATOR}{i}. {memory['content']}")
+            
+        return buf.getvalue()
     
     def add_memory(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -59,10 +161,11 @@ class Agent(BaseModel):
         if metadata is None:
             metadata = {}
             
-        self.memory.append({
+        memory = {
             "content": content,
             "metadata": metadata
-        })
+        }
+        self.memory.append(memory)
         
     def update_knowledge(self, key: str, value: Any) -> None:
         """
@@ -1,10 +1,14 @@
 """
 Role model
 """
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from dataclasses import dataclass, field, fields
+from string import Formatter
+from typing import Dict, Any, List, Optional, Tuple
 
-class Role(BaseModel):
+_FORMATTER = Formatter()
+
+@dataclass(slots=True, kw_only=True)
+class Role:
     """
     Represents a role that can be assigned to agents in the process.
     """
@@ -13,8 +17,35 @@ class Role(BaseModel):
     description: str
     system_prompt_template: Optional[str] = None
     model: Optional[str] = None
-    required_skills: List[str] = Field(default_factory=list)
-    knowledge_sources: List[str] = Field(default_factory=list)
+    required_skills: List[str] = field(default_factory=list)
+    knowledge_sources: List[str] = field(default_factory=list)
+    
+    # Parsed system_prompt_template as (literal, field_name, format_spec, conversion) tuples
+    _compiled_template: Optional[List[Tuple[str, Optional[str], str, Optional[str]]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _compiled_source: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Role":
+        """
+        Create a role from a dictionary, e.g. loaded from YAML.
+        
+        Args:
+            data: Role data; unknown keys are ignored
+            
+        Returns:
+            A new Role instance
+            
+        Raises:
+            ValueError: If a required field is missing or has the wrong type
+        """
+        for required in ("id", "name", "description"):
+            if not isinstance(data.get(required), str):
+                raise ValueError(f"Role field '{required}' must be a string")
+        
+        init_fields = {f.name for f in fields(cls) if f.init}
+        return cls(**{key: value for key, value in data.items() if key in init_fields})
     
     def format_system_prompt(self, context: Dict[str, Any] = None) -> str:
         """
@@ -42,20 +73,41 @@ class Role(BaseModel):
                 
             return base_prompt
             
-        # Use template if provided
-        if not context:
-            context = {}
+        # Use template if provided, parsing it only when it changes
+        if self._compiled_source != self.system_prompt_template:
+            self._compiled_template = list(_FORMATTER.parse(self.system_prompt_template))
+            self._compiled_source = self.system_prompt_template
             
-        # Add role info to context
-        context.update({
+        # Add role info to context without mutating the caller's dict
+        values = dict(context) if context else {}
+        values.update({
             "role_name": self.name,
             "role_description": self.description,
             "role_skills": self.required_skills,
             "role_knowledge_sources": self.knowledge_sources
         })
         
+        # Missing keys render as empty strings instead of aborting the whole template;
+        # invalid conversions or format specs fall back to the default prompt
         try:
-            return self.system_prompt_template.format(**context)
-        except KeyError as e:
-            # Fall back to default if template has missing keys
-            return f"Template error ({str(e)}). You are a {self.name}. {self.description}" 
\ No newline at end of file
+            rendered = []
+            for literal, field_name, format_spec, conversion in self._compiled_template:
+                rendered.append(literal)
+                if field_name is None:
+                    continue
+                if field_name in values:
+                    value = values[field_name]
+                else:
+                    try:
+                        value, _ = _FORMATTER.get_field(field_name, (), values)
+                    except (KeyError, IndexError, AttributeError):
+                        continue
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                if "{" in format_spec:
+                    # Nested fields in the spec, e.g. {x:>{width}}
+                    format_spec = _FORMATTER.vformat(format_spec, (), values)
+                rendered.append(format(value, format_spec))
+            return "".join(rendered)
+        except (KeyError, ValueError) as e:
+            return f"Template error ({str(e)}). You are a {self.name}. {self.description}"
@@ -2,10 +2,16 @@
 Scenario model
 """
 
+from dataclasses import fields, is_dataclass
 from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 
 
+def _dataclass_dict(obj: Any) -> Dict[str, Any]:
+    """Serialize a dataclass by its constructor fields, leaving out private caches"""
+    return {f.name: getattr(obj, f.name) for f in fields(obj) if f.init}
+
+
 class State(BaseModel):
     """
     Represents a state in the scenario graph.
@@ -172,7 +178,7 @@ class Scenario(BaseModel):
             "description": self.description,
             "states": [state.dict() for state in self.states],
             "transitions": [transition.dict() for transition in self.transitions],
-            "roles": [role.dict() if hasattr(role, "dict") else role for role in self.roles],
+            "roles": [_dataclass_dict(role) if is_dataclass(role) else role.dict() if hasattr(role, "dict") else role for role in self.roles],
             "learner": self.learner,
             "learner_role": self.learner_role,
             "evolution": self.evolution
@@ -7,16 +7,49 @@ from agir_db.db.session import get_db
 
 logger = logging.getLogger(__name__)
 
+# Set once every required table has been found; tables aren't dropped mid-run, so later
+# checks in the same process (e.g. run.py, then run_construction) skip the inspection
+_tables_verified = False
+
+# Custom fields are always looked up by user and field name, so without an index on
+# those columns every lookup scans the whole table. The schema is owned by agir_db,
+# so a missing index is reported rather than created; a unique index also keeps a
+# user from getting the same field twice, and its user_id prefix serves per-user reads
+CUSTOM_FIELDS_INDEX_COLUMNS = ["user_id", "field_name"]
+CUSTOM_FIELDS_INDEX_DDL = (
+    "CREATE UNIQUE INDEX CONCURRENTLY ix_custom_fields_user_field "
+    "ON custom_fields (user_id, field_name);"
+)
+
+# The API's login creates users with INSERT ... ON CONFLICT (email), which Postgres
+# rejects unless users.email has a unique index or constraint
+USERS_EMAIL_UNIQUE_DDL = "CREATE UNIQUE INDEX CONCURRENTLY ix_users_email ON users (email);"
+
+def _is_unique(inspector, table: str, columns: List[str]) -> bool:
+    """Return True if a unique index or constraint on table covers exactly the given columns"""
+    unique_indexes = [index for index in inspector.get_indexes(table) if index.get("unique")]
+    return any(
+        index["column_names"] == columns
+        for index in unique_indexes + inspector.get_unique_constraints(table)
+    )
+
+def _has_index(inspector, table: str, columns: List[str]) -> bool:
+    """Return True if an index or unique constraint on table starts with the given columns"""
+    indexes = inspector.get_indexes(table) + inspector.get_unique_constraints(table)
+    return any(index["column_names"][:len(columns)] == columns for index in indexes)
+
 def check_database_tables() -> bool:
     """
     Check if all required database tables exist.
     
-    Args:
-        db: Database session
-        
     Returns:
         bool: True if all tables exist, False otherwise
     """
+    global _tables_verified
+    if _tables_verified:
+        return True
+    
+    db = None
     try:
 
         db = next(get_db())
@@ -57,6 +90,20 @@ def check_database_tables() -> bool:
             return False
         
         logger.info("All required database tables exist")
+        
+        if not _has_index(inspector, 'custom_fields', CUSTOM_FIELDS_INDEX_COLUMNS):
+            logger.warning(
+                f"custom_fields has no index on {tuple(CUSTOM_FIELDS_INDEX_COLUMNS)}; "
+                f"custom field lookups will scan the table. Create it with: {CUSTOM_FIELDS_INDEX_DDL}"
+            )
+        
+        if not _is_unique(inspector, 'users', ['email']):
+            logger.error(
+                "users.email has no unique index or constraint; API logins will fail. "
+                f"Create it with: {USERS_EMAIL_UNIQUE_DDL}"
+            )
+        
+        _tables_verified = True
         return True
         
     except SQLAlchemyError as e:
@@ -64,4 +111,7 @@ def check_database_tables() -> bool:
         return False
     except Exception as e:
         logger.error(f"Unexpected error while checking tables: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+    finally:
+        if db is not None:
+            db.close()
@@ -6,6 +6,8 @@ import json
 import uuid
 from typing import Dict, Any, List, Optional, Tuple
 import logging
+from sqlalchemy import String, insert
+from uuid6 import uuid7
 from sqlalchemy.orm import Session
 from agir_db.models.user import User
 from agir_db.models.scenario import Scenario as DBScenario
@@ -19,6 +21,15 @@ logger = logging.getLogger(__name__)
 # from sqlalchemy import Column, Integer, String, Text, ForeignKey
 # from agir_db.db.base_class import Base
 
+# Profile fields the API reads straight from the user row. Where the User model has a
+# column for one, it is stored there instead of as a custom field, so reading a profile
+# needs no extra query
+_USER_PROFILE_COLUMNS = tuple(
+    name for name in ("avatar", "description", "profession", "personality_traits",
+                      "background", "interests", "skills")
+    if name in User.__table__.columns
+)
+
 def get_or_create_user(db: Session, username: str, user_data: Dict[str, Any]) -> Tuple[User, bool]:
     """
     Get an existing user by username or create a new one.
@@ -66,21 +77,32 @@ def get_or_create_user(db: Session, username: str, user_data: Dict[str, Any]) ->
     if llm_model and hasattr(new_user, 'llm_model'):
         new_user.llm_model = llm_model
     
+    # Keep profile fields on the user row when the model has columns for them
+    for name in _USER_PROFILE_COLUMNS:
+        value = user_data.pop(name, None)
+        if value is not None:
+            if isinstance(value, (list, dict)) and isinstance(User.__table__.columns[name].type, String):
+                value = json.dumps(value)
+            setattr(new_user, name, value)
+    
     db.add(new_user)
     db.flush()  # Flush to get the ID without committing
     
-    # Save remaining fields as custom fields
-    if user_data:
-        for key, value in user_data.items():
-            if value is not None:
-                if isinstance(value, (list, dict)):
-                    value = json.dumps(value)
-                custom_field = CustomField(
-                    user_id=new_user.id,
-                    field_name=key,
-                    field_value=str(value)
-                )
-                db.add(custom_field)
+    # Save remaining fields as custom fields, all in one bulk INSERT; the user is new,
+    # so none of them can exist yet
+    custom_fields = []
+    for key, value in user_data.items():
+        if value is not None:
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value)
+            custom_fields.append({
+                "id": uuid7(),
+                "user_id": new_user.id,
+                "field_name": key,
+                "field_value": str(value)
+            })
+    if custom_fields:
+        db.execute(insert(CustomField), custom_fields)
     
     db.commit()
     db.refresh(new_user)
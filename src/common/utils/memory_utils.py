@@ -15,8 +15,6 @@ import uuid
 import datetime
 import numpy as np
 import json
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from contextlib import contextmanager
 
 # Import FAISS - exit if not available
@@ -59,10 +57,13 @@ def get_embedding_model(model_name: Optional[str] = None):
         model_name = DEFAULT_EMBEDDING_MODEL
     
     # Check if it's an OpenAI model
+    # The SDKs are imported on first use, so loading this module doesn't load them
     if model_name.startswith("text-embedding"):
+        from langchain_openai import OpenAIEmbeddings
         return OpenAIEmbeddings(model=model_name)
     else:
         # Default to HuggingFace for other models
+        from langchain_community.embeddings import HuggingFaceEmbeddings
         return HuggingFaceEmbeddings(model_name=model_name)
 
 def generate_embedding(text: str, model_name: Optional[str] = None) -> List[float]:
@@ -97,15 +97,15 @@ def load_scenario_from_file(file_path: str) -> Optional[Scenario]:
                 role_id = role_data.get("id", role_data["name"])
                 capabilities = role_data.get("capabilities", [])
                 
-                roles.append(Role(
-                    id=role_id,
-                    name=role_data["name"],
-                    description=role_data.get("description", ""),
-                    system_prompt_template=role_data.get("system_prompt_template"),
-                    model=role_data.get("model"),
-                    required_skills=role_data.get("required_skills", []),
-                    knowledge_sources=role_data.get("knowledge_sources", [])
-                ))
+                roles.append(Role.from_dict({
+                    "id": role_id,
+                    "name": role_data["name"],
+                    "description": role_data.get("description", ""),
+                    "system_prompt_template": role_data.get("system_prompt_template"),
+                    "model": role_data.get("model"),
+                    "required_skills": role_data.get("required_skills", []),
+                    "knowledge_sources": role_data.get("knowledge_sources", [])
+                }))
             else:
                 # Simple string format - use the string as both ID and name
                 role_name = str(role_data)
@@ -0,0 +1,147 @@
+"""
+Micro-batching for completion requests.
+Concurrent prompts for the same user and model settings are collected for a
+short window and sent to the LLM as one batch instead of one call each.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Only needed for annotations; the batcher just calls the completions it is given
+    from src.completions.fast_completion import FastCompletion
+
+logger = logging.getLogger(__name__)
+
+# Batch limits (can be overridden via environment variables)
+COMPLETION_BATCH_SIZE = int(os.environ.get("COMPLETION_BATCH_SIZE", 32))
+COMPLETION_BATCH_WAIT_MS = float(os.environ.get("COMPLETION_BATCH_WAIT_MS", 10))
+
+# Completion modes and the FastCompletion batch method that serves them
+BATCH_METHODS = {
+    "simple": "complete_batch",
+    "cot": "complete_cot_batch",
+}
+
+def _length_bucket(prompt: str) -> int:
+    """Power-of-two bucket of a prompt's word count"""
+    return len(prompt.split()).bit_length()
+
+class CompletionBatcher:
+    """
+    Collects completion requests from request threads and dispatches them in batches.
+
+    Requests are grouped by user, model, temperature, max_tokens, mode and prompt
+    length bucket; each group is completed with a single batched call on a worker
+    thread, so collection of the next batch is never blocked by a running LLM call.
+    Bucketing by length keeps short prompts from waiting on (or being padded to)
+    much longer ones in the same batch.
+    """
+
+    def __init__(self, batch_size: int = COMPLETION_BATCH_SIZE, max_wait_ms: float = COMPLETION_BATCH_WAIT_MS, max_workers: int = 8):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_size: Maximum number of requests collected into one batch
+            max_wait_ms: How long to wait for more requests after the first one arrives
+            max_workers: Number of batches that can run concurrently
+        """
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[FastCompletion, str, str, Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="completion-batch")
+        self._collector: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, completion: "FastCompletion", prompt: str, mode: str = "cot") -> str:
+        """
+        Queue a prompt for batched completion and wait for its result
+
+        Args:
+            completion: FastCompletion configured for the request's user and model
+            prompt: Input prompt
+            mode: "cot" for the thinking-chain completion, "simple" for a plain completion
+
+        Returns:
+            Generated completion
+        """
+        if mode not in BATCH_METHODS:
+            raise ValueError(f"Unknown completion mode: {mode}")
+
+        self._ensure_collector()
+        future: Future = Future()
+        self._queue.put((completion, prompt, mode, future))
+        return future.result()
+
+    def _ensure_collector(self):
+        """Start the collector thread on first use"""
+        if self._collector is not None:
+            return
+        with self._lock:
+            if self._collector is None:
+                self._collector = threading.Thread(target=self._collect, name="completion-batcher", daemon=True)
+                self._collector.start()
+
+    def _collect(self):
+        """Gather queued requests into batches and hand them to the worker pool"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            groups: "Dict[tuple, List[Tuple[FastCompletion, str, str, Future]]]" = {}
+            for item in batch:
+                completion, prompt, mode, _ = item
+                key = (
+                    completion.user_id, completion.model_name, completion.temperature, completion.max_tokens, mode,
+                    _length_bucket(prompt)
+                )
+                groups.setdefault(key, []).append(item)
+
+            for items in groups.values():
+                self._executor.submit(self._run_group, items)
+
+    def _run_group(self, items: "List[Tuple[FastCompletion, str, str, Future]]"):
+        """Complete one group of requests that share a user and model settings"""
+        completion, _, mode, _ = items[0]
+        prompts = [prompt for _, prompt, _, _ in items]
+        try:
+            results = getattr(completion, BATCH_METHODS[mode])(prompts)
+            logger.info(f"Completed batch of {len(prompts)} {mode} prompts for user {completion.user_id}")
+            for (_, _, _, future), result in zip(items, results):
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"Error completing batch: {str(e)}")
+            for _, _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+_batcher: Optional[CompletionBatcher] = None
+_batcher_lock = threading.Lock()
+
+def get_completion_batcher() -> CompletionBatcher:
+    """
+    Get the process-wide completion batcher
+
+    Returns:
+        CompletionBatcher instance
+    """
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = CompletionBatcher()
+    return _batcher
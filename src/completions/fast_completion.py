@@ -4,13 +4,15 @@ Uses FAISS-based memory retrieval for optimal performance.
 """
 
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterator, List, Tuple
 from sqlalchemy.orm import Session
 
 from agir_db.db.session import get_db
 from agir_db.models.user import User
 from src.llm.llm_provider import get_llm_model
-from src.completions.fast_memory_retriever import get_fast_memory_retriever
+from src.completions.fast_memory_retriever import RETRIEVER_CACHE_LIMIT, get_fast_memory_retriever
 from langchain.schema import HumanMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
@@ -21,8 +23,10 @@ _user_cache_limit = 100
 
 def _get_cached_user(user_id: str) -> Optional[User]:
     """Get user from cache or database"""
-    if user_id in _user_cache:
-        return _user_cache[user_id]
+    # A single lookup, so a concurrent cache clear can't remove the key between check and read
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
     
     try:
         db = next(get_db())
@@ -79,7 +83,8 @@ class FastCompletion:
             max_tokens=max_tokens
         )
         
-        # Initialize memory retriever
+        # Keep the user's retriever for the life of the instance, so its FAISS index stays
+        # loaded even if the shared retriever cache evicts it
         self.memory_retriever = get_fast_memory_retriever(user_id)
         
         logger.info(f"Initialized fast completion for user {self.user.username} with {self.memory_retriever.get_memory_count()} memories")
@@ -106,39 +111,79 @@ class FastCompletion:
             Generated completion
         """
         try:
-            relevant_memories = self.memory_retriever.search_memories(prompt, k=5)
-
- # Format memories for context
-            memory_context = self._format_memories_for_context(relevant_memories)
-            
-            # Create system prompt with user context and memories
-            system_prompt = f"""Use the following context as a reference to inform your response.
-
-{memory_context}
-
-Respond as the expert you are, and provide the best possible answer."""
-            
-            logger.warning(f"System prompt: {system_prompt}")
-            logger.warning(f"Prompt: {prompt}")
-            # Create messages for LLM
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=prompt)
-            ]
+            messages = self._completion_messages(prompt)
             
             # Generate response
             response = self.llm.invoke(messages)
             
             # Extract content
-            if hasattr(response, 'content'):
-                return response.content
-            else:
-                return str(response)
+            return self._response_text(response)
                 
         except Exception as e:
             logger.error(f"Error generating completion: {str(e)}")
             return f"Error: {str(e)}"
     
+    def complete_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Generate completions for several prompts with one batched LLM call
+        
+        Args:
+            prompts: Input prompts
+            
+        Returns:
+            Generated completions, in the same order as the prompts
+        """
+        results: List[Optional[str]] = [None] * len(prompts)
+        batch_indexes = []
+        batch_messages = []
+        for i, prompt in enumerate(prompts):
+            try:
+                batch_messages.append(self._completion_messages(prompt))
+                batch_indexes.append(i)
+            except Exception as e:
+                logger.error(f"Error generating completion: {str(e)}")
+                results[i] = f"Error: {str(e)}"
+        
+        if batch_messages:
+            responses = self.llm.batch(batch_messages, return_exceptions=True)
+            for i, response in zip(batch_indexes, responses):
+                if isinstance(response, Exception):
+                    logger.error(f"Error generating completion: {str(response)}")
+                    results[i] = f"Error: {str(response)}"
+                else:
+                    results[i] = self._response_text(response)
+        
+        return results
+    
+    def _completion_messages(self, prompt: str) -> List[Any]:
+        """Build the LLM messages for a simple completion of the prompt"""
+        relevant_memories = self.memory_retriever.search_memories(prompt, k=5)
+
+        # Format memories for context
+        memory_context = self._format_memories_for_context(relevant_memories)
+        
+        # Create system prompt with user context and memories
+        system_prompt = f"""Use the following context as a reference to inform your response.
+
+{memory_context}
+
+Respond as the expert you are, and provide the best possible answer."""
+        
+        logger.warning(f"System prompt: {system_prompt}")
+        logger.warning(f"Prompt: {prompt}")
+        # Create messages for LLM
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=prompt)
+        ]
+    
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Extract the text content of an LLM response"""
+        if hasattr(response, 'content'):
+            return response.content
+        return str(response)
+    
         
     def complete_cot(self, prompt: str) -> str:
         """
@@ -167,6 +212,84 @@ Respond as the expert you are, and provide the best possible answer."""
             logger.error(f"Error generating completion: {str(e)}")
             return f"Error: {str(e)}"
     
+    def complete_cot_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Generate completions for several prompts with the enhanced thinking process,
+        batching the LLM calls of each step
+        
+        Args:
+            prompts: Input prompts
+            
+        Returns:
+            Generated completions, in the same order as the prompts
+        """
+        results: List[Optional[str]] = [None] * len(prompts)
+        
+        # Step 1: Search for initial relevant memories
+        pending = []
+        for i, prompt in enumerate(prompts):
+            try:
+                pending.append((i, prompt, self.memory_retriever.search_memories(prompt, k=5)))
+            except Exception as e:
+                logger.error(f"Error generating completion: {str(e)}")
+                results[i] = f"Error: {str(e)}"
+        if not pending:
+            return results
+        
+        # Step 2: Analyze what knowledge is needed, one batched LLM call for all prompts
+        analyses = self.llm.batch(
+            [self._analysis_messages(prompt, memories) for _, prompt, memories in pending],
+            return_exceptions=True
+        )
+        
+        # Step 3: Search for additional memories based on analysis
+        final_inputs = []
+        for (i, prompt, initial_memories), analysis in zip(pending, analyses):
+            if isinstance(analysis, Exception):
+                logger.error(f"Error in knowledge analysis: {str(analysis)}")
+                analysis = "General knowledge and experience would be helpful for answering this question."
+            else:
+                analysis = self._response_text(analysis)
+            memories = self._search_memories_with_analysis(prompt, analysis, initial_memories)
+            final_inputs.append((i, self._final_response_messages(prompt, memories, analysis)))
+        
+        # Step 4: Generate final responses, one batched LLM call for all prompts
+        responses = self.llm.batch([messages for _, messages in final_inputs], return_exceptions=True)
+        for (i, _), response in zip(final_inputs, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error generating final response: {str(response)}")
+                results[i] = f"Error generating response: {str(response)}"
+            else:
+                results[i] = self._response_text(response)
+        
+        return results
+    
+    def stream_cot(self, prompt: str) -> Iterator[str]:
+        """
+        Generate a thinking-chain completion, yielding the final response as it is produced
+        
+        Args:
+            prompt: Input prompt
+            
+        Yields:
+            Chunks of the generated completion
+        """
+        try:
+            # Steps 1-3 as in complete_cot: initial memories, analysis, follow-up search
+            initial_memories = self.memory_retriever.search_memories(prompt, k=5)
+            thinking_response = self._analyze_knowledge_needs(prompt, initial_memories)
+            relevant_memories = self._search_memories_with_analysis(prompt, thinking_response, initial_memories)
+            
+            # Step 4: Stream the final response
+            for chunk in self.llm.stream(self._final_response_messages(prompt, relevant_memories, thinking_response)):
+                text = self._response_text(chunk)
+                if text:
+                    yield text
+                
+        except Exception as e:
+            logger.error(f"Error generating completion: {str(e)}")
+            yield f"Error: {str(e)}"
+    
     def _analyze_knowledge_needs(self, prompt: str, existing_memories: List[Dict[str, Any]] = None) -> str:
         """
         Analyze what professional knowledge is needed to answer the prompt
@@ -184,11 +307,25 @@ Respond as the expert you are, and provide the best possible answer."""
             if existing_memories is None:
                 existing_memories = self.memory_retriever.search_memories(prompt, k=5)
             
-            # Format existing knowledge
-            existing_knowledge = self._format_existing_knowledge(existing_memories)
+            messages = self._analysis_messages(prompt, existing_memories)
+            
+            response = self.llm.invoke(messages)
+            analysis = self._response_text(response)
             
-            # Analyze what additional knowledge is needed
-            analysis_prompt = f"""Based on the following question and your existing knowledge/experience, analyze what additional professional knowledge might be needed to provide a comprehensive answer.
+            logger.info(f"Knowledge analysis completed based on {len(existing_memories)} existing memories for prompt: {prompt[:50]}...")
+            return analysis
+            
+        except Exception as e:
+            logger.error(f"Error in knowledge analysis: {str(e)}")
+            return "General knowledge and experience would be helpful for answering this question."
+    
+    def _analysis_messages(self, prompt: str, existing_memories: List[Dict[str, Any]]) -> List[Any]:
+        """Build the LLM messages for the knowledge analysis step"""
+        # Format existing knowledge
+        existing_knowledge = self._format_existing_knowledge(existing_memories)
+        
+        # Analyze what additional knowledge is needed
+        analysis_prompt = f"""Based on the following question and your existing knowledge/experience, analyze what additional professional knowledge might be needed to provide a comprehensive answer.
 
 QUESTION: {prompt}
 
@@ -206,20 +343,10 @@ Provide a structured analysis in 2-3 sentences that identifies:
 - Specific gaps or additional perspectives that would be valuable
 - How your existing knowledge can be enhanced or supplemented"""
 
-            messages = [
-                SystemMessage(content=f"You are {self.user.first_name} {self.user.last_name}, analyzing what additional knowledge you need to comprehensively answer a question based on your existing knowledge and experience."),
-                HumanMessage(content=analysis_prompt)
-            ]
-            
-            response = self.llm.invoke(messages)
-            analysis = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"Knowledge analysis completed based on {len(existing_memories)} existing memories for prompt: {prompt[:50]}...")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error in knowledge analysis: {str(e)}")
-            return "General knowledge and experience would be helpful for answering this question."
+        return [
+            SystemMessage(content=f"You are {self.user.first_name} {self.user.last_name}, analyzing what additional knowledge you need to comprehensively answer a question based on your existing knowledge and experience."),
+            HumanMessage(content=analysis_prompt)
+        ]
     
     def _format_existing_knowledge(self, memories: List[Dict[str, Any]]) -> str:
         """Format existing memories for knowledge analysis"""
@@ -335,11 +462,26 @@ Provide a structured analysis in 2-3 sentences that identifies:
             Final response
         """
         try:
-            # Format memories for context
-            memory_context = self._format_memories_for_context(memories)
+            messages = self._final_response_messages(prompt, memories, analysis)
             
-            # Create enhanced system prompt
-            system_prompt = f"""You are {self.user.first_name} {self.user.last_name}, an expert with deep knowledge and experience.
+            # Generate final response
+            response = self.llm.invoke(messages)
+            final_answer = self._response_text(response)
+            
+            logger.info(f"Generated comprehensive response for prompt: {prompt[:50]}...")
+            return final_answer
+            
+        except Exception as e:
+            logger.error(f"Error generating final response: {str(e)}")
+            return f"Error generating response: {str(e)}"
+    
+    def _final_response_messages(self, prompt: str, memories: List[Dict[str, Any]], analysis: str) -> List[Any]:
+        """Build the LLM messages for the final response step"""
+        # Format memories for context
+        memory_context = self._format_memories_for_context(memories)
+        
+        # Create enhanced system prompt
+        system_prompt = f"""You are {self.user.first_name} {self.user.last_name}, an expert with deep knowledge and experience.
 
 KNOWLEDGE ANALYSIS:
 {analysis}
@@ -356,22 +498,11 @@ INSTRUCTIONS:
 
 Respond as the expert you are, using your knowledge to provide valuable insights."""
 
-            # Create messages for final response
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=f"Based on your expertise and the relevant knowledge provided, please answer this question comprehensively:\n\n{prompt}")
-            ]
-            
-            # Generate final response
-            response = self.llm.invoke(messages)
-            final_answer = response.content if hasattr(response, 'content') else str(response)
-            
-            logger.info(f"Generated comprehensive response for prompt: {prompt[:50]}...")
-            return final_answer
-            
-        except Exception as e:
-            logger.error(f"Error generating final response: {str(e)}")
-            return f"Error generating response: {str(e)}"
+        # Create messages for final response
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=f"Based on your expertise and the relevant knowledge provided, please answer this question comprehensively:\n\n{prompt}")
+        ]
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get memory statistics"""
@@ -384,6 +515,14 @@ Respond as the expert you are, using your knowledge to provide valuable insights
             "max_tokens": self.max_tokens
         }
 
+# Completion instances are stateless between calls, so reuse them across requests
+# with the same settings; least recently used entries are evicted first. Each one holds
+# its user's memory retriever, so the limit matches the retriever cache's to bound how
+# many FAISS indexes stay loaded
+_completion_cache: "OrderedDict[tuple, FastCompletion]" = OrderedDict()
+_completion_cache_limit = RETRIEVER_CACHE_LIMIT
+_completion_cache_lock = threading.Lock()
+
 def create_fast_completion(user_id: str, temperature: float = 0.7, max_tokens: Optional[int] = None, model: Optional[str] = None) -> Optional[FastCompletion]:
     """
     Create a fast completion instance
@@ -397,8 +536,32 @@ def create_fast_completion(user_id: str, temperature: float = 0.7, max_tokens: O
     Returns:
         FastCompletion instance or None if failed
     """
+    cache_key = (user_id, temperature, max_tokens, model)
+    with _completion_cache_lock:
+        completion = _completion_cache.get(cache_key)
+        if completion is not None:
+            _completion_cache.move_to_end(cache_key)
+            return completion
+    
     try:
-        return FastCompletion(user_id, temperature, max_tokens, model)
+        completion = FastCompletion(user_id, temperature, max_tokens, model)
     except Exception as e:
         logger.error(f"Failed to create fast completion: {str(e)}")
-        return None 
\ No newline at end of file
+        return None
+    
+    with _completion_cache_lock:
+        _completion_cache[cache_key] = completion
+        while len(_completion_cache) > _completion_cache_limit:
+            _completion_cache.popitem(last=False)
+    return completion
+
+def get_completion_cache_sizes() -> Tuple[int, int]:
+    """Get the number of cached users and completion instances"""
+    return len(_user_cache), len(_completion_cache)
+
+def clear_completion_cache():
+    """Clear cached completion instances and users"""
+    with _completion_cache_lock:
+        _completion_cache.clear()
+    _user_cache.clear()
+    logger.info("Completion cache cleared") 
\ No newline at end of file
@@ -4,7 +4,10 @@ Pre-loads user memories into vector store for fast similarity search.
 """
 
 import logging
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
 from typing import Dict, List, Optional, Any
 from sqlalchemy.orm import Session
 import numpy as np
@@ -12,8 +15,6 @@ from datetime import datetime
 
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
 from agir_db.db.session import get_db
 from agir_db.models.user import User
@@ -60,10 +61,12 @@ class FastMemoryRetriever:
         self._load_memories()
     
     def _get_embedding_model(self, model_name: str):
-        """Get embedding model instance"""
+        """Get embedding model instance, importing only the SDK it needs"""
         if model_name.startswith("text-embedding"):
+            from langchain_openai import OpenAIEmbeddings
             return OpenAIEmbeddings(model=model_name)
         else:
+            from langchain_community.embeddings import HuggingFaceEmbeddings
             return HuggingFaceEmbeddings(model_name=model_name)
     
     def _load_memories(self):
@@ -292,9 +295,13 @@ class FastMemoryRetriever:
         self.memories_metadata.clear()
         self._load_memories()
 
-# Global cache for memory retrievers to avoid reloading
-_retriever_cache: Dict[str, FastMemoryRetriever] = {}
-_cache_size_limit = 50  # Limit cache size to prevent memory issues
+# Global cache for memory retrievers to avoid reloading; least recently used entries are
+# evicted first. Each retriever holds a FAISS index, so the cache is kept small
+RETRIEVER_CACHE_LIMIT = 50
+_retriever_cache: "OrderedDict[str, FastMemoryRetriever]" = OrderedDict()
+_retriever_cache_lock = threading.Lock()
+# Retrievers being built, so concurrent misses for the same user wait for one build
+_retriever_builds: Dict[str, Future] = {}
 
 def get_fast_memory_retriever(user_id: str, embedding_model: str = DEFAULT_EMBEDDING_MODEL) -> FastMemoryRetriever:
     """
@@ -309,26 +316,45 @@ def get_fast_memory_retriever(user_id: str, embedding_model: str = DEFAULT_EMBED
     """
     cache_key = f"{user_id}:{embedding_model}"
     
-    # Check cache
-    if cache_key in _retriever_cache:
-        return _retriever_cache[cache_key]
+    # Check cache, or join a build already in progress
+    with _retriever_cache_lock:
+        retriever = _retriever_cache.get(cache_key)
+        if retriever is not None:
+            _retriever_cache.move_to_end(cache_key)
+            return retriever
+        build = _retriever_builds.get(cache_key)
+        is_builder = build is None
+        if is_builder:
+            build = Future()
+            _retriever_builds[cache_key] = build
+    if not is_builder:
+        return build.result()
     
     # Create new retriever
-    retriever = FastMemoryRetriever(user_id, embedding_model)
+    try:
+        retriever = FastMemoryRetriever(user_id, embedding_model)
+    except Exception as e:
+        with _retriever_cache_lock:
+            del _retriever_builds[cache_key]
+        build.set_exception(e)
+        raise
     
     # Cache with size limit
-    if len(_retriever_cache) < _cache_size_limit:
+    with _retriever_cache_lock:
+        del _retriever_builds[cache_key]
         _retriever_cache[cache_key] = retriever
-    else:
-        # Remove oldest entry (simple FIFO)
-        oldest_key = next(iter(_retriever_cache))
-        del _retriever_cache[oldest_key]
-        _retriever_cache[cache_key] = retriever
-    
+        while len(_retriever_cache) > RETRIEVER_CACHE_LIMIT:
+            _retriever_cache.popitem(last=False)
+    build.set_result(retriever)
     return retriever
 
+def get_memory_cache_keys() -> List[str]:
+    """Get a snapshot of the cached retriever keys"""
+    with _retriever_cache_lock:
+        return list(_retriever_cache)
+
 def clear_memory_cache():
     """Clear the memory retriever cache"""
-    global _retriever_cache
-    _retriever_cache.clear()
-    logger.info("Memory retriever cache cleared") 
\ No newline at end of file
+    with _retriever_cache_lock:
+        _retriever_cache.clear()
+    logger.info("Memory retriever cache cleared")
@@ -35,6 +35,7 @@ def run_construction(yaml_file_path: str, created_by: Optional[str] = None) -> O
             return None
         
         # Create or update database records
+        db = None
         try:
             db = next(get_db())
             
@@ -66,4 +67,9 @@ def run_construction(yaml_file_path: str, created_by: Optional[str] = None) -> O
             
         except Exception as e:
             logger.error(f"Failed to initialize scenario from {yaml_file_path}: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+        finally:
+            # The session isn't taken through get_db's generator cleanup, so close it here,
+            # including on the early returns
+            if db is not None:
+                db.close()
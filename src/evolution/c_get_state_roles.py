@@ -3,13 +3,44 @@ import sys
 import time
 import json
 import uuid
-from typing import List
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
 from sqlalchemy.orm import Session
 from agir_db.models.agent_role import AgentRole
 from agir_db.models.state_role import StateRole
 
 logger = logging.getLogger(__name__)
 
+# Roles are attached to states when a scenario is built and never change afterwards,
+# so each state's role ids are looked up once per process; the roles themselves are
+# loaded through the session so they stay attached to it
+_state_role_ids_cache: "OrderedDict[int, Tuple]" = OrderedDict()
+_state_role_ids_cache_limit = 1024
+_state_role_ids_cache_lock = threading.Lock()
+
+def _get_state_role_ids(db: Session, state_id: int) -> Tuple:
+  """Return the ids of the roles attached to a state, from the cache when possible"""
+  with _state_role_ids_cache_lock:
+      role_ids = _state_role_ids_cache.get(state_id)
+      if role_ids is not None:
+          _state_role_ids_cache.move_to_end(state_id)
+          return role_ids
+  
+  role_ids = tuple(
+      agent_role_id for (agent_role_id,) in db.query(StateRole.agent_role_id).filter(
+          StateRole.state_id == state_id
+      ).all()
+  )
+  
+  # A state without roles is an error for the caller, so it is not remembered
+  if role_ids:
+      with _state_role_ids_cache_lock:
+          _state_role_ids_cache[state_id] = role_ids
+          while len(_state_role_ids_cache) > _state_role_ids_cache_limit:
+              _state_role_ids_cache.popitem(last=False)
+  return role_ids
+
 def c_get_state_roles(db: Session, state_id: int) -> List[AgentRole]:
   """
   Get all roles associated with a state.
@@ -23,23 +54,17 @@ def c_get_state_roles(db: Session, state_id: int) -> List[AgentRole]:
   """
   try:
       # Get all role IDs for this state from the StateRole table
-      state_roles = db.query(StateRole).filter(
-          StateRole.state_id == state_id
-      ).all()
+      role_ids = _get_state_role_ids(db, state_id)
       
-      if not state_roles:
+      if not role_ids:
           logger.error(f"No roles found for state: {state_id}")
           sys.exit(1)
       
-      # Get the actual AgentRole objects
-      roles = []
-      for state_role in state_roles:
-          role = db.query(AgentRole).filter(
-              AgentRole.id == state_role.agent_role_id
-          ).first()
-          
-          if role:
-              roles.append(role)
+      # Get the actual AgentRole objects with one query, keeping the StateRole order
+      roles_by_id = {
+          role.id: role for role in db.query(AgentRole).filter(AgentRole.id.in_(role_ids)).all()
+      }
+      roles = [roles_by_id[role_id] for role_id in role_ids if role_id in roles_by_id]
       
       if not roles:
           logger.error(f"Failed to get roles for state: {state_id}")
@@ -40,7 +40,8 @@ def d_get_or_create_user_for_state(db: Session, role_id: int) -> Optional[User]:
             logger.error(f"Episode not found")
             sys.exit(1)
             
-        agentRole = db.query(AgentRole).filter(AgentRole.id == role_id).first()
+        # The state's roles were just loaded, so this is served from the session's identity map
+        agentRole = db.get(AgentRole, role_id)
         if not agentRole:
             logger.error(f"Role not found: {role_id}")
             sys.exit(1)
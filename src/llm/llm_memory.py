@@ -4,7 +4,6 @@ from typing import List, Optional, Dict, Any, Union, Callable
 import uuid
 
 from langchain.schema import Document
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langchain_core.language_models.chat_models import BaseChatModel
 
@@ -1,15 +1,14 @@
 import os
 import logging
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List, Union
 
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage
 
-from src.llm.llm_memory import enhance_messages_with_memories
 
 logger = logging.getLogger(__name__)
 
@@ -190,6 +189,8 @@ class OpenAILangChainProvider(BaseLangChainProvider):
         elif self.max_tokens is not None:
             logger.warning(f"Model {self.model_name} does not support max_tokens parameter, skipping")
         
+        # Imported here so only the SDK of the provider actually used is loaded
+        from langchain_openai import ChatOpenAI
         self._llm = ChatOpenAI(**kwargs)
     
     def _model_supports_temperature(self) -> bool:
@@ -242,6 +243,8 @@ class AnthropicLangChainProvider(BaseLangChainProvider):
         if self.max_tokens is not None:
             kwargs['max_tokens'] = self.max_tokens
         
+        # Imported here so only the SDK of the provider actually used is loaded
+        from langchain_anthropic import ChatAnthropic
         self._llm = ChatAnthropic(**kwargs)
 
 def detect_provider_type(model_name: str) -> str:
@@ -268,6 +271,12 @@ def detect_provider_type(model_name: str) -> str:
         logger.warning(f"Unknown model type: {model_name}, defaulting to OpenAI")
         return "openai"
 
+# LLM clients are thread-safe and each holds its own HTTP connection pool, so reuse
+# them across callers with the same settings instead of opening new connections
+_llm_cache: "OrderedDict[tuple, BaseChatModel]" = OrderedDict()
+_llm_cache_limit = 64
+_llm_cache_lock = threading.Lock()
+
 def get_llm_model(model_name: str, temperature: float = 0.7, max_tokens: Optional[int] = None) -> BaseChatModel:
     """Get a LangChain provider for the specified model
     
@@ -282,6 +291,23 @@ def get_llm_model(model_name: str, temperature: float = 0.7, max_tokens: Optiona
     if not model_name:
         raise ValueError("Model name must be specified")
     
+    cache_key = (model_name, temperature, max_tokens)
+    with _llm_cache_lock:
+        llm = _llm_cache.get(cache_key)
+        if llm is not None:
+            _llm_cache.move_to_end(cache_key)
+            return llm
+    
+    llm = _create_llm_model(model_name, temperature, max_tokens)
+    
+    with _llm_cache_lock:
+        _llm_cache[cache_key] = llm
+        while len(_llm_cache) > _llm_cache_limit:
+            _llm_cache.popitem(last=False)
+    return llm
+
+def _create_llm_model(model_name: str, temperature: float, max_tokens: Optional[int]) -> BaseChatModel:
+    """Create a new LangChain LLM for the specified model and settings"""
     provider_type = detect_provider_type(model_name)
     
     if provider_type == 'openai':
@@ -316,6 +342,8 @@ def call_llm_with_memory(llm: BaseChatModel, messages: List[BaseMessage], user_i
     """
     # Enhance messages with memories if query is provided
     if query:
+        # Imported here so loading the provider doesn't pull in the embedding SDKs
+        from src.llm.llm_memory import enhance_messages_with_memories
         messages = enhance_messages_with_memories(messages, user_id, query)
     
     # Try different invocation methods since LangChain versions have different interfaces
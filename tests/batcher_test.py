@@ -0,0 +1,110 @@
+"""
+Tests for the completion micro-batcher
+"""
+import sys
+import os
+import threading
+from concurrent.futures import Future, wait
+
+import pytest
+
+# Add the project root to sys.path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.completions.batcher import CompletionBatcher
+
+
+class FakeCompletion:
+    """Stands in for FastCompletion, recording every batch it is asked to complete"""
+
+    def __init__(self, user_id="user-1", model_name="model", temperature=0.7, max_tokens=None, error=None):
+        self.user_id = user_id
+        self.model_name = model_name
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.error = error
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def complete_batch(self, prompts):
+        return self._complete("simple", prompts)
+
+    def complete_cot_batch(self, prompts):
+        return self._complete("cot", prompts)
+
+    def _complete(self, mode, prompts):
+        with self._lock:
+            self.batches.append((mode, list(prompts)))
+        if self.error:
+            raise self.error
+        return [f"{self.user_id}:{mode}:{prompt}" for prompt in prompts]
+
+
+def _run(requests):
+    """Queue all requests before the collector starts, so they land in one batch"""
+    batcher = CompletionBatcher(max_wait_ms=50)
+    futures = []
+    for completion, prompt, mode in requests:
+        future = Future()
+        batcher._queue.put((completion, prompt, mode, future))
+        futures.append(future)
+    batcher._ensure_collector()
+    done, not_done = wait(futures, timeout=5)
+    assert not not_done
+    return futures
+
+
+def test_results_are_returned_to_their_own_requests():
+    completion = FakeCompletion()
+    futures = _run([(completion, "a", "cot"), (completion, "b", "cot")])
+
+    assert [f.result() for f in futures] == ["user-1:cot:a", "user-1:cot:b"]
+    assert completion.batches == [("cot", ["a", "b"])]
+
+
+def test_batch_failure_reaches_every_future():
+    error = RuntimeError("LLM unavailable")
+    completion = FakeCompletion(error=error)
+    futures = _run([(completion, prompt, "simple") for prompt in ("a", "b", "c")])
+
+    for future in futures:
+        assert future.exception() is error
+    assert len(completion.batches) == 1
+
+
+def test_failure_in_one_group_leaves_others_untouched():
+    failing = FakeCompletion(user_id="user-1", error=RuntimeError("boom"))
+    working = FakeCompletion(user_id="user-2")
+    futures = _run([(failing, "a", "cot"), (working, "b", "cot")])
+
+    with pytest.raises(RuntimeError):
+        futures[0].result()
+    assert futures[1].result() == "user-2:cot:b"
+
+
+def test_groups_stay_separate():
+    user_1 = FakeCompletion(user_id="user-1")
+    user_2 = FakeCompletion(user_id="user-2")
+    other_temperature = FakeCompletion(user_id="user-1", temperature=0.2)
+    long_prompt = " ".join(["word"] * 64)
+    futures = _run([
+        (user_1, "a", "cot"),
+        (user_2, "b", "cot"),
+        (user_1, "c", "simple"),
+        (other_temperature, "d", "cot"),
+        (user_1, long_prompt, "cot"),
+        (user_1, "e", "cot"),
+    ])
+
+    assert [f.result() for f in futures] == [
+        "user-1:cot:a", "user-2:cot:b", "user-1:simple:c", "user-1:cot:d", f"user-1:cot:{long_prompt}", "user-1:cot:e"
+    ]
+    assert sorted(user_1.batches) == [("cot", ["a", "e"]), ("cot", [long_prompt]), ("simple", ["c"])]
+    assert user_2.batches == [("cot", ["b"])]
+    assert other_temperature.batches == [("cot", ["d"])]
+
+
+def test_submit_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        CompletionBatcher().submit(FakeCompletion(), "a", mode="unknown")
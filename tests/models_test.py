@@ -0,0 +1,176 @@
+"""
+Tests for the Agent, Role and Scenario models
+"""
+import sys
+import os
+import uuid
+from itertools import islice
+
+import pytest
+
+# Add the project root to sys.path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.common.models import Agent, Role, Scenario
+from src.common.models.agent import _id_pool
+
+
+def _role(**overrides):
+    data = {
+        "id": "nurse",
+        "name": "Nurse",
+        "description": "Cares for patients",
+        "system_prompt_template": "You are {role_name}.",
+        "required_skills": ["triage"],
+        "knowledge_sources": ["handbook"],
+    }
+    data.update(overrides)
+    return Role.from_dict(data)
+
+
+def test_role_round_trips_through_scenario_dict():
+    role = _role()
+    # Compile the template so the private cache fields are populated
+    role.format_system_prompt()
+
+    data = Scenario(name="Clinic", roles=[role]).to_dict()["roles"][0]
+
+    assert "_compiled_template" not in data
+    assert "_compiled_source" not in data
+    assert Role.from_dict(data) == role
+
+
+def test_agent_round_trips_through_from_dict():
+    agent = Agent.from_dict({"name": "Ann", "role": "nurse", "skills": ["triage"]})
+    agent.add_memory("Met a patient")
+    agent.build_system_prompt()
+
+    data = Scenario(name="Clinic", roles=[agent]).to_dict()["roles"][0]
+
+    assert not any(key.startswith("_") for key in data)
+    assert Agent.from_dict(data) == agent
+
+
+def test_from_dict_ignores_unknown_keys():
+    role = _role(extra="ignored", _compiled_source="ignored")
+    assert role._compiled_source is None
+
+
+@pytest.mark.parametrize("missing", ["id", "name", "description"])
+def test_role_from_dict_requires_string_fields(missing):
+    data = {"id": "nurse", "name": "Nurse", "description": "Cares for patients"}
+    del data[missing]
+    with pytest.raises(ValueError, match=missing):
+        Role.from_dict(data)
+
+    data[missing] = 42
+    with pytest.raises(ValueError, match=missing):
+        Role.from_dict(data)
+
+
+def test_agent_from_dict_requires_string_fields():
+    with pytest.raises(ValueError, match="role"):
+        Agent.from_dict({"name": "Ann"})
+
+
+def test_format_system_prompt_renders_missing_fields_as_empty():
+    role = _role(system_prompt_template="Hi {patient}, I am {role_name}{missing.attr}.")
+    assert role.format_system_prompt({"patient": "Bob"}) == "Hi Bob, I am Nurse."
+
+
+def test_format_system_prompt_supports_indexed_and_converted_fields():
+    role = _role(system_prompt_template="{role_skills[0]} {items[1]} {role_name!r} {score:.1f} {role_skills[5]}")
+    prompt = role.format_system_prompt({"items": ["a", "b"], "score": 2})
+    assert prompt == "triage b 'Nurse' 2.0 "
+
+
+def test_format_system_prompt_skips_spec_of_missing_field():
+    role = _role(system_prompt_template="Score {score:.1f} ({grade!r:>5})")
+    assert role.format_system_prompt() == "Score  ()"
+
+
+def test_format_system_prompt_supports_nested_spec():
+    role = _role(system_prompt_template="[{x:>{width}}]")
+    assert role.format_system_prompt({"x": "a", "width": 3}) == "[  a]"
+
+
+def test_format_system_prompt_falls_back_on_invalid_spec():
+    role = _role(system_prompt_template="{role_name:d}")
+    assert role.format_system_prompt().startswith("Template error (")
+    assert role.format_system_prompt().endswith("You are a Nurse. Cares for patients")
+
+
+def test_format_system_prompt_recompiles_changed_template():
+    role = _role()
+    assert role.format_system_prompt() == "You are Nurse."
+
+    role.system_prompt_template = "{role_description}"
+    assert role.format_system_prompt() == "Cares for patients"
+
+
+def test_format_system_prompt_does_not_mutate_context():
+    context = {"patient": "Bob"}
+    _role().format_system_prompt(context)
+    assert context == {"patient": "Bob"}
+
+
+def test_format_system_prompt_default_without_template():
+    role = _role(system_prompt_template=None)
+    assert role.format_system_prompt() == (
+        "You are a Nurse. Cares for patients"
+        "\n\nYour skills include: triage."
+        "\n\nYou have knowledge from: handbook."
+    )
+
+
+def test_id_pool_yields_uuid4_strings_across_batches():
+    ids = list(islice(_id_pool(batch_size=4), 10))
+
+    assert len(set(ids)) == len(ids)
+    for value in ids:
+        parsed = uuid.UUID(value)
+        assert str(parsed) == value
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
+
+
+def test_agents_get_distinct_ids():
+    agents = [Agent(name="Ann", role="nurse") for _ in range(300)]
+    assert len({agent.id for agent in agents}) == len(agents)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_does_not_reuse_parent_ids():
+    # Buffer a batch in the parent before forking
+    Agent(name="Ann", role="nurse")
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        child_ids = "\n".join(Agent(name="Ann", role="nurse").id for _ in range(10))
+        os.write(write_fd, child_ids.encode())
+        os._exit(0)
+    os.close(write_fd)
+    parent_ids = {Agent(name="Ann", role="nurse").id for _ in range(10)}
+    with os.fdopen(read_fd) as pipe:
+        child_ids = set(pipe.read().split("\n"))
+    os.waitpid(pid, 0)
+
+    assert len(child_ids) == 10
+    assert not parent_ids & child_ids
+
+
+def test_system_prompt_follows_memory_changes():
+    agent = Agent.from_dict({"name": "Ann", "role": "nurse", "memory": [{"content": "first"}]})
+    assert agent.build_system_prompt().endswith("1. first")
+
+    agent.add_memory("second")
+    agent.memory[0] = {"content": "edited"}
+    assert agent.build_system_prompt().endswith("1. edited\n\n2. second")
+
+    agent.memory = [{"content": str(i)} for i in range(10)]
+    assert agent.build_system_prompt().endswith("1. 5\n\n2. 6\n\n3. 7\n\n4. 8\n\n5. 9")
+
+    agent.memory = []
+    assert agent.build_system_prompt() == "You are Ann, a nurse."
@@ -0,0 +1,78 @@
+"""
+Tests for JWT verification
+"""
+import sys
+import os
+import time
+
+import jwt
+import pytest
+
+# Add the project root to sys.path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from api.middleware import tokens
+from api.middleware.tokens import decode_jwt
+
+SECRET = "test-secret"
+
+
+@pytest.fixture(autouse=True)
+def jwt_key(monkeypatch):
+    monkeypatch.setattr(tokens, "JWT_KEY", tokens._HS256.prepare_key(SECRET))
+
+
+def _token(secret=SECRET, algorithm="HS256", **claims):
+    payload = {"sub": "user-1", "exp": int(time.time()) + 60}
+    payload.update(claims)
+    return jwt.encode(payload, secret, algorithm=algorithm)
+
+
+def test_valid_token_matches_pyjwt():
+    token = _token()
+    assert decode_jwt(token) == jwt.decode(token, SECRET, algorithms=["HS256"])
+
+
+def test_expired_token():
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_jwt(_token(exp=int(time.time()) - 1))
+
+
+def test_token_not_yet_valid():
+    with pytest.raises(jwt.ImmatureSignatureError):
+        decode_jwt(_token(nbf=int(time.time()) + 60))
+
+
+def test_bad_signature():
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_jwt(_token(secret="other-secret-with-enough-length"))
+
+
+def test_tampered_payload():
+    header, payload, signature = _token().split(".")
+    other_payload = _token(sub="user-2").split(".")[1]
+    with pytest.raises(jwt.InvalidSignatureError):
+        decode_jwt(f"{header}.{other_payload}.{signature}")
+
+
+def test_other_algorithm_is_rejected():
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        decode_jwt(_token(algorithm="HS512"))
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b", "a.b.c.d", "!!!.???.***", "e30.e30"])
+def test_malformed_token(token):
+    with pytest.raises(jwt.DecodeError):
+        decode_jwt(token)
+
+
+def test_non_numeric_exp():
+    with pytest.raises(jwt.DecodeError):
+        decode_jwt(_token(exp="tomorrow"))
+
+
+def test_missing_secret(monkeypatch):
+    monkeypatch.setattr(tokens, "JWT_KEY", None)
+    with pytest.raises(jwt.InvalidKeyError):
+        decode_jwt(_token())
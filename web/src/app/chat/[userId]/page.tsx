@@ -33,13 +33,8 @@ interface Conversation {
   related_type: string
   related_id: string
   messages: Message[]
-}
-
-interface ConversationItem {
-  id: string
-  related_type: string
-  related_id: string
-  [key: string]: unknown
+  has_more: boolean
+  next_cursor: string | null
 }
 
 export default function ChatPage() {
@@ -50,6 +45,7 @@ export default function ChatPage() {
   const [message, setMessage] = useState("")
   const [loading, setLoading] = useState(true)
   const [sending, setSending] = useState(false)
+  const [loadingEarlier, setLoadingEarlier] = useState(false)
   const [error, setError] = useState<string | null>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const scrollAreaRef = useRef<HTMLDivElement>(null)
@@ -76,10 +72,12 @@ export default function ChatPage() {
 
         // Try to find existing conversation with this user
         try {
-          const conversations = await chatAPI.getConversations()
-          const userConversation = conversations.find(
-            (conv: ConversationItem) => conv.related_type === "user" && conv.related_id === userId
-          )
+          const conversations = await chatAPI.getConversations({
+            limit: 1,
+            relatedType: "user",
+            relatedId: userId,
+          })
+          const userConversation = conversations.items[0]
 
           if (userConversation) {
             const conversationData = await chatAPI.getConversationById(userConversation.id)
@@ -117,10 +115,18 @@ export default function ChatPage() {
       // Clear the input
       setMessage("")
 
-      // Refresh conversation to get latest messages
+      // Refresh conversation to get latest messages, keeping any earlier pages already loaded
       if (response.conversation_id) {
-        const updatedConversation = await chatAPI.getConversationById(response.conversation_id)
-        setConversation(updatedConversation)
+        const latest: Conversation = await chatAPI.getConversationById(response.conversation_id)
+        setConversation((previous) => {
+          if (!previous || previous.id !== latest.id) return latest
+          const latestIds = new Set(latest.messages.map((msg) => msg.id))
+          const earlier = previous.messages.filter((msg) => !latestIds.has(msg.id))
+          // The latest page overlaps what is loaded, so older messages stay reachable
+          // through the cursor already held
+          if (earlier.length === previous.messages.length && latest.has_more) return latest
+          return { ...previous, messages: [...earlier, ...latest.messages] }
+        })
       }
     } catch (err) {
       console.error("Failed to send message:", err)
@@ -130,6 +136,32 @@ export default function ChatPage() {
     }
   }
 
+  const handleLoadEarlier = async () => {
+    if (!conversation?.next_cursor || loadingEarlier) return
+
+    try {
+      setLoadingEarlier(true)
+      const page: Conversation = await chatAPI.getConversationById(
+        conversation.id,
+        50,
+        conversation.next_cursor
+      )
+      setConversation((previous) =>
+        previous && {
+          ...previous,
+          messages: [...page.messages, ...previous.messages],
+          has_more: page.has_more,
+          next_cursor: page.next_cursor,
+        }
+      )
+    } catch (err) {
+      console.error("Failed to load earlier messages:", err)
+      setError("Failed to load earlier messages. Please try again.")
+    } finally {
+      setLoadingEarlier(false)
+    }
+  }
+
   const handleKeyDown = (e: React.KeyboardEvent) => {
     if (e.key === "Enter" && !e.shiftKey) {
       e.preventDefault()
@@ -201,6 +233,19 @@ export default function ChatPage() {
                     </div>
                   ) : (
                     <div className="space-y-4 pb-2">
+                      {conversation.has_more && (
+                        <div className="flex justify-center">
+                          <Button
+                            variant="ghost"
+                            size="sm"
+                            onClick={handleLoadEarlier}
+                            disabled={loadingEarlier}
+                          >
+                            {loadingEarlier && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+                            Load earlier messages
+                          </Button>
+                        </div>
+                      )}
                       {conversation.messages.map((msg) => (
                         <div
                           key={msg.id}
@@ -25,7 +25,9 @@ interface Conversation {
 export default function ChatPage() {
   const router = useRouter()
   const [conversations, setConversations] = useState<Conversation[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
 
   useEffect(() => {
@@ -33,7 +35,8 @@ export default function ChatPage() {
       try {
         setLoading(true)
         const data = await chatAPI.getConversations()
-        setConversations(data)
+        setConversations(data.items)
+        setNextCursor(data.next_cursor)
         setError(null)
       } catch (err) {
         console.error("Failed to fetch conversations:", err)
@@ -46,6 +49,22 @@ export default function ChatPage() {
     fetchConversations()
   }, [])
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return
+
+    try {
+      setLoadingMore(true)
+      const data = await chatAPI.getConversations({ cursor: nextCursor })
+      setConversations((previous) => [...previous, ...data.items])
+      setNextCursor(data.next_cursor)
+    } catch (err) {
+      console.error("Failed to fetch more conversations:", err)
+      setError("Failed to load conversations. Please try again later.")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleViewConversation = (id: string) => {
     router.push(`/chat/${id}`)
   }
@@ -114,6 +133,15 @@ export default function ChatPage() {
           ))}
         </div>
       )}
+
+      {!loading && !error && nextCursor && (
+        <div className="flex justify-center mt-8">
+          <Button variant="outline" onClick={handleLoadMore} disabled={loadingMore}>
+            {loadingMore && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
+            Load more
+          </Button>
+        </div>
+      )}
     </div>
   )
 } 
\ No newline at end of file
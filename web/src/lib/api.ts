@@ -116,7 +116,11 @@ export const episodesAPI = {
  * Steps API
  */
 export const stepsAPI = {
-  getAll: () => fetchAPI<any[]>('/api/steps'),
+  getAll: (limit = 50, cursor?: string) => {
+    let url = `/api/steps?limit=${limit}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    return fetchAPI<any>(url);
+  },
   getById: (id: string) => fetchAPI<any>(`/api/steps/${id}`),
   getDetails: (id: string) => fetchAPI<any>(`/api/steps/${id}/details`),
   getConversations: (id: string) => fetchAPI<any[]>(`/api/steps/${id}/conversations`),
@@ -161,8 +165,20 @@ export const memoriesAPI = {
  * Chat API
  */
 export const chatAPI = {
-  getConversations: () => fetchAPI<any[]>('/api/chat/conversations'),
-  getConversationById: (id: string) => fetchAPI<any>(`/api/chat/conversations/${id}`),
+  getConversations: (
+    options: { limit?: number; cursor?: string; relatedType?: string; relatedId?: string } = {}
+  ) => {
+    let url = `/api/chat/conversations?limit=${options.limit ?? 50}`;
+    if (options.cursor) url += `&cursor=${encodeURIComponent(options.cursor)}`;
+    if (options.relatedType) url += `&related_type=${options.relatedType}`;
+    if (options.relatedId) url += `&related_id=${options.relatedId}`;
+    return fetchAPI<any>(url);
+  },
+  getConversationById: (id: string, limit = 50, cursor?: string) => {
+    let url = `/api/chat/conversations/${id}?limit=${limit}`;
+    if (cursor) url += `&cursor=${encodeURIComponent(cursor)}`;
+    return fetchAPI<any>(url);
+  },
   sendToUser: (userId: string, content: string, conversationId?: string) => 
     fetchAPI<any>(`/api/chat/user/${userId}/send`, {
       method: 'POST',